@@ -4,196 +4,251 @@ Handles call triggering, history, and processing
 """
 
 import asyncio
+import itertools
+import logging
 import time
-from typing import Dict, Any, List
-from fastapi import APIRouter, HTTPException
-from retell import Retell
+from typing import Dict, Any, Iterator, Optional
+
+import orjson
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 
 from app.core.config import settings
-from app.models.schemas import CallRequest, CallResultResponse
+from app.core.http_cache import apply_cache_headers
+from app.core.retell import retell_client
+from app.models.schemas import (
+    CallRequest, CallHistoryResponse, CallDetailsResponse, RecordingWebhookResponse
+)
 from app.services.database import get_database_service
+from app.services.call_store import get_call_store
 
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Shared store for active calls (in-memory or Redis)
+call_store = get_call_store()
+
+# Structured fields that map to their own call_results columns
+STRUCTURED_FIELDS = frozenset({
+    "call_outcome", "driver_status", "current_location", "eta",
+    "emergency_type", "emergency_location", "escalation_status"
+})
 
-# Initialize Retell client
-retell_client = Retell(api_key=settings.RETELL_API_KEY)
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
 
-# In-memory store for active calls
-active_calls: Dict[str, Dict[str, Any]] = {}
+# Published agent lookup rarely changes, so cache it briefly
+AGENT_INFO_CACHE_TTL = 60.0
+_agent_info_cache: Dict[str, Any] = {"key": None, "value": None, "expires": 0.0}
+_agent_info_lock = asyncio.Lock()
 
 @router.post("/trigger-call")
 async def trigger_phone_call(call_request: CallRequest):
     """Trigger a phone call to a driver"""
-    try:
-        response = retell_client.call.create_phone_call(
-            agent_id=settings.RETELL_AGENT_ID,
-            to_number=call_request.phone_number,
-            from_number=settings.RETELL_PHONE_NUMBER,
-            metadata={
-                "driver_name": call_request.driver_name,
-                "load_number": call_request.load_number
-            }
-        )
-        
-        return {"success": True, "call": response}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to trigger call: {str(e)}")
+    response = await asyncio.to_thread(
+        retell_client.call.create_phone_call,
+        agent_id=settings.RETELL_AGENT_ID,
+        to_number=call_request.phone_number,
+        from_number=settings.RETELL_PHONE_NUMBER,
+        metadata={
+            "driver_name": call_request.driver_name,
+            "load_number": call_request.load_number
+        }
+    )
+    
+    return {"success": True, "call": response}
 
 @router.post("/create-test-call")
 async def create_web_call(request: dict):
     """Create a web call with dynamic variables for testing"""
-    try:
-        # Get published agent info
-        published_agent_id, agent_version = get_published_agent_info()
-        
-        call_metadata = {
-            "driver_name": request.get("driver_name", "Driver"),
-            "phone_number": request.get("phone_number", ""),
-            "load_number": request.get("load_number", "Load")
-        }
-        
-        call_params = {
-            "agent_id": published_agent_id,
-            "metadata": call_metadata
-        }
-        
-        if agent_version is not None:
-            call_params["agent_version"] = agent_version
-        
-        response = retell_client.call.create_web_call(**call_params)
-        
-        # Store variables for WebSocket
-        active_calls[response.call_id] = call_metadata
-        
-        # Create database record
-        asyncio.create_task(create_call_database_record(response.call_id, call_metadata))
-        
-        return {
-            "success": True, 
-            "call_id": response.call_id, 
-            "access_token": response.access_token
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to create web call: {str(e)}")
+    # Get published agent info
+    published_agent_id, agent_version = await get_published_agent_info()
+    
+    call_metadata = {
+        "driver_name": request.get("driver_name", "Driver"),
+        "phone_number": request.get("phone_number", ""),
+        "load_number": request.get("load_number", "Load")
+    }
+    
+    call_params = {
+        "agent_id": published_agent_id,
+        "metadata": call_metadata
+    }
+    
+    if agent_version is not None:
+        call_params["agent_version"] = agent_version
+    
+    response = await asyncio.to_thread(retell_client.call.create_web_call, **call_params)
+    
+    # Store variables for WebSocket
+    await call_store.set(response.call_id, call_metadata)
+    
+    # Create database record inline - it's cheap next to the Retell round trip
+    await create_call_database_record(response.call_id, call_metadata)
+    
+    return {
+        "success": True, 
+        "call_id": response.call_id, 
+        "access_token": response.access_token
+    }
 
-@router.get("/call-history")
-async def get_call_history(limit: int = 50):
-    """Get call history (optimized - no detailed data per call)"""
-    try:
-        db = get_database_service()
-        calls = db.get_call_history(limit=limit)
-        
-        # Return basic call history without expensive per-call lookups
-        # Detailed data can be fetched via /call-details/{call_id} when needed
-        return {"success": True, "calls": calls}
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get call history: {str(e)}")
+@router.get("/call-history", response_model=CallHistoryResponse)
+def get_call_history(
+    request: Request,
+    response: Response,
+    limit: int = 50,
+    call_outcome: Optional[str] = None,
+    emergency_type: Optional[str] = None,
+    escalation_status: Optional[str] = None
+):
+    """Get call history (optimized - no detailed data per call)
+    
+    Clients sending `Accept: application/x-ndjson` get one call per line,
+    streamed as rows arrive from the database. The optional filters match
+    against the call's structured data.
+    """
+    structured_filter = {
+        key: value for key, value in (
+            ("call_outcome", call_outcome),
+            ("emergency_type", emergency_type),
+            ("escalation_status", escalation_status)
+        ) if value
+    }
+    
+    db = get_database_service()
+    
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        rows = db.iter_call_history(limit=limit, structured_filter=structured_filter)
+        # Run the query before the response starts, so pool and database errors still get a status code
+        first = next(rows, None)
+        if first is not None:
+            rows = itertools.chain((first,), rows)
+        return StreamingResponse(
+            _iter_call_history_ndjson(rows),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers={"X-Accel-Buffering": "no"}
+        )
+    
+    calls = db.get_call_history(limit=limit, structured_filter=structured_filter)
+    
+    # Return basic call history without expensive per-call lookups
+    # Detailed data can be fetched via /call-details/{call_id} when needed
+    result = CallHistoryResponse(success=True, calls=calls)
+    return apply_cache_headers(request, response, result) or result
 
-@router.get("/call-details/{call_id}")
-async def get_call_details(call_id: str):
+def _iter_call_history_ndjson(rows: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    """Encode streamed call history rows as newline-delimited JSON"""
+    for row in rows:
+        yield orjson.dumps(row) + b"\n"
+
+@router.get("/call-details/{call_id}", response_model=CallDetailsResponse)
+def get_call_details(call_id: str):
     """Get detailed call information"""
-    try:
-        db = get_database_service()
-        call_result = db.get_call_with_tools(call_id)
-        
-        if not call_result:
-            raise HTTPException(status_code=404, detail="Call not found")
-        
-        conversation = db.get_call_conversation(call_id)
-        call_result['full_conversation'] = conversation
-        
-        return {"success": True, "call": call_result}
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get call details: {str(e)}")
+    db = get_database_service()
+    # Call row and conversation come from the same record - fetch them in one round trip
+    call_result = db.get_call_with_conversation(call_id)
+    
+    if not call_result:
+        raise HTTPException(status_code=404, detail="Call not found")
+    
+    return CallDetailsResponse(success=True, call=call_result)
 
-@router.post("/recording-webhook")
+@router.post("/recording-webhook", response_model=RecordingWebhookResponse, response_model_exclude_unset=True)
 async def recording_webhook(recording_data: Dict[str, Any]):
     """Handle call recording and process final transcript"""
-    try:
-        call_id = recording_data.get("call_id")
-        transcript = recording_data.get("transcript", [])
-        
-        # Use accumulated data from real-time extraction (no additional API call needed!)
-        call_data = active_calls.get(call_id, {})
-        structured_data = call_data.get("extracted_data", {})
-        
-        # Use our stored transcript if Retell's transcript is empty or missing
-        if not transcript and call_data.get("full_transcript"):
-            transcript = call_data.get("full_transcript", [])
-            print(f"📝 Using stored transcript with {len(transcript)} messages")
-        
+    call_id = recording_data.get("call_id")
+    transcript = recording_data.get("transcript", [])
+    
+    # Use accumulated data from real-time extraction (no additional API call needed!)
+    call_data = await call_store.get(call_id) if call_id else {}
+    # Copy - the in-memory store hands out the live dict the WebSocket handler merges into
+    structured_data = dict(call_data.get("extracted_data", {}))
+    
+    # Use our stored transcript if Retell's transcript is empty or missing
+    if not transcript:
+        stored_transcript = call_data.get("full_transcript")
+        if stored_transcript:
+            transcript = stored_transcript
+            logger.info("📝 Using stored transcript with %d messages", len(transcript))
+    
+    if structured_data:
+        logger.info("✅ Using accumulated data for %s: %d fields", call_id, len(structured_data))
+        # Add final summary
+        structured_data["summary"] = build_call_summary(call_data)
+    else:
         # If no accumulated data, create minimal fallback data
-        if not structured_data:
-            print(f"⚠️ No accumulated data for {call_id}, using minimal fallback")
-            structured_data = {
-                "call_outcome": "Call Completed",
-                "confidence": 0.3,
-                "summary": f"Call completed with {call_data.get('driver_name', 'driver')} about load {call_data.get('load_number', 'N/A')} - no data extracted during conversation"
-            }
-        else:
-            print(f"✅ Using accumulated data for {call_id}: {len(structured_data)} fields")
-            # Add final summary
-            structured_data["summary"] = f"Call completed with {call_data.get('driver_name', 'driver')} about load {call_data.get('load_number', 'N/A')}"
-        
-        # Store in database
-        db = get_database_service()
-        update_data = {
-            "call_status": "completed",
-            "call_ended_at": time.time(),
-            "full_transcript": transcript,
-            "structured_data": structured_data
+        logger.warning("⚠️ No accumulated data for %s, using minimal fallback", call_id)
+        structured_data = {
+            "call_outcome": "Call Completed",
+            "confidence": 0.3,
+            "summary": build_call_summary(call_data) + " - no data extracted during conversation"
         }
-        
-        # Add structured data fields
-        for field in ["call_outcome", "driver_status", "current_location", "eta", 
-                     "emergency_type", "emergency_location", "escalation_status"]:
-            if field in structured_data:
-                update_data[field] = structured_data[field]
-        
-        success = await db.update_call_result(call_id, update_data)
-        
-        # Clean up call data
-        if call_id and call_id in active_calls:
-            del active_calls[call_id]
-        
-        return {"success": True, "structured_data": structured_data}
-        
-    except Exception as e:
-        return {"success": False, "error": str(e)}
+    
+    # Store in database (first use creates the pool - keep its connects off the event loop)
+    db = await asyncio.to_thread(get_database_service)
+    update_data = {
+        "call_status": "completed",
+        "call_ended_at": time.time(),
+        "full_transcript": transcript,
+        "structured_data": structured_data
+    }
+    
+    # Add structured data fields (written together in a single UPDATE)
+    update_data.update({f: structured_data[f] for f in STRUCTURED_FIELDS & structured_data.keys()})
+    
+    # Call data is left to expire via the store TTL so late events still see it
+    success = await db.update_call_result(call_id, update_data)
+    
+    # success is False when no call_results row matched or the write failed
+    return RecordingWebhookResponse(success=success, structured_data=structured_data)
 
 
-def get_published_agent_info():
-    """Get published agent information"""
-    try:
-        agents = retell_client.agent.list()
-        
-        published_agents = []
-        for agent in agents:
-            if (agent.agent_id == settings.RETELL_AGENT_ID and 
-                agent.is_published and 
-                agent.response_engine.type == 'custom-llm'):
-                version = getattr(agent, 'version', 0)
-                published_agents.append((agent, version))
-        
-        if published_agents:
-            published_agents.sort(key=lambda x: x[1], reverse=True)
-            agent, version = published_agents[0]
-            return agent.agent_id, version
+def build_call_summary(call_data: Dict[str, Any]) -> str:
+    """Build the one-line summary stored with a completed call"""
+    return f"Call completed with {call_data.get('driver_name', 'driver')} about load {call_data.get('load_number', 'N/A')}"
+
+async def get_published_agent_info():
+    """Get published agent information (cached for AGENT_INFO_CACHE_TTL seconds)"""
+    cache_key = settings.RETELL_AGENT_ID
+    if _agent_info_cache["key"] == cache_key and time.monotonic() < _agent_info_cache["expires"]:
+        return _agent_info_cache["value"]
+    
+    async with _agent_info_lock:
+        # Another request may have refreshed the cache while we waited
+        if _agent_info_cache["key"] == cache_key and time.monotonic() < _agent_info_cache["expires"]:
+            return _agent_info_cache["value"]
         
-        return settings.RETELL_AGENT_ID, None
+        try:
+            value = await _fetch_published_agent_info()
+        except Exception as e:
+            # Don't cache failures - fall back to the configured agent
+            logger.warning("⚠️ Could not fetch published agent info, using configured agent: %s", e)
+            return settings.RETELL_AGENT_ID, None
         
-    except Exception as e:
-        return settings.RETELL_AGENT_ID, None
+        _agent_info_cache.update(key=cache_key, value=value, expires=time.monotonic() + AGENT_INFO_CACHE_TTL)
+        return value
+
+async def _fetch_published_agent_info():
+    """Look up the latest published version of the configured agent"""
+    # Only fetch versions of our agent instead of listing every agent in the account
+    agents = await asyncio.to_thread(retell_client.agent.get_versions, settings.RETELL_AGENT_ID)
+    
+    published_agents = []
+    for agent in agents:
+        if agent.is_published and agent.response_engine.type == 'custom-llm':
+            version = getattr(agent, 'version', 0)
+            published_agents.append((agent, version))
+    
+    if published_agents:
+        agent, version = max(published_agents, key=lambda x: x[1])
+        return agent.agent_id, version
+    
+    return settings.RETELL_AGENT_ID, None
 
 async def create_call_database_record(call_id: str, call_metadata: Dict[str, Any]):
     """Create initial database record for the call"""
     try:
-        db = get_database_service()
+        db = await asyncio.to_thread(get_database_service)
         
         call_data = {
             "call_id": call_id,
@@ -209,5 +264,5 @@ async def create_call_database_record(call_id: str, call_metadata: Dict[str, Any
         
         await db.create_call_result(call_data)
             
-    except Exception as e:
-        print(f"❌ Error creating call database record: {e}")
+    except Exception:
+        logger.exception("❌ Error creating call database record for %s", call_id)
@@ -4,69 +4,85 @@ Handles real-time communication with Retell AI - EXACT COPY from working backend
 """
 
 import asyncio
-import json
+import logging
+import re
 import time
-from typing import List, Dict, Any
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from collections import deque
+from typing import Callable, Deque, List, Dict, Any, Optional
+
+import orjson
+from fastapi import APIRouter, WebSocket
+from openai import AsyncOpenAI
 
 from app.core.config import settings
+from app.api.v1.endpoints.calls import STRUCTURED_FIELDS, build_call_summary
+from app.services.database import DatabaseService, get_database_service
+from app.services.call_store import CallState, get_call_store
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Shared store for active calls (populated by the calls module)
+call_store = get_call_store()
+
+# Retell expects a ping_pong at least every 2 seconds while the connection is idle
+PING_PONG_INTERVAL = 2.0
 
-# Import active_calls from calls module
-from app.api.v1.endpoints.calls import active_calls
+# ping_pong frames only differ by timestamp, so skip building and dumping a dict per tick
+PING_PONG_PREFIX = '{"response_type":"ping_pong","timestamp":'
 
 @router.websocket("/llm-websocket/{call_id}")
 async def llm_websocket(websocket: WebSocket, call_id: str):
     """WebSocket endpoint for custom LLM integration with Retell AI"""
     await websocket.accept()
-    print(f"🔌 WebSocket connected for call: {call_id}")
+    logger.info("🔌 WebSocket connected for call: %s", call_id)
     
-    # Get variables from temporary storage (will be cleaned up after call)
-    call_data = active_calls.get(call_id, {})
-    driver_name = call_data.get("driver_name", "Driver")
-    load_number = call_data.get("load_number", "your load")
+    # Load call state once; the handler works on this local object for the whole call
+    state = CallState.from_dict(await call_store.get(call_id))
+    driver_name = state.driver_name
+    load_number = state.load_number
     
-    print(f"✅ Using variables for OpenAI: driver={driver_name}, load={load_number}")
+    logger.info("✅ Using variables for OpenAI: driver=%s, load=%s", driver_name, load_number)
     
+    # Rolling LLM context: last 6 messages (3 exchanges) keeps us within token limits.
+    # history_index tracks how much of Retell's transcript has already been folded in.
+    conversation_history: Deque[Dict[str, str]] = deque(maxlen=6)
+    history_index = 0
+    
+    # All outbound frames (responses and keepalives) go through one writer task
+    writer = FrameWriter(websocket)
+    writer.start()
     
     try:
-        # Generate first message dynamically using LLM with variables
-        print(f"🎯 Generating first message with LLM for {driver_name}, load {load_number}")
-        first_message_content = await generate_first_message_simple(driver_name, load_number)
-        print(f"✅ LLM generated first message: {first_message_content}")
+        # First message is a fixed template - format it once, no LLM call
+        first_message_content = generate_first_message_simple(driver_name, load_number)
         
-        first_response = {
+        writer.send({
             "response_id": 0,
             "content": first_message_content,
             "content_complete": True,
             "end_call": False
-        }
-        
-        await websocket.send_text(json.dumps(first_response))
-        print(f"✅ Sent first message: {first_message_content}")
-        
-        # Start ping-pong task to maintain connection
-        ping_task = asyncio.create_task(send_ping_pong(websocket))
+        })
+        logger.debug("✅ Sent first message: %s", first_message_content)
         
-        # Handle ongoing conversation
-        while True:
+        # Handle ongoing conversation - iteration ends when Retell disconnects.
+        # No receive timeout: the writer's ping_pong is the only timer per connection.
+        async for payload in iter_frames(websocket):
             try:
-                # Receive message from Retell with timeout
-                message = await asyncio.wait_for(websocket.receive_text(), timeout=30.0)
-                request_data = json.loads(message)
+                # orjson parses the raw frame payload directly, text or binary
+                request_data = orjson.loads(payload)
                 
                 # Reduced logging: Only log essential info, not massive transcript
                 interaction_type = request_data.get("interaction_type")
                 response_id = request_data.get("response_id", "N/A")
-                print(f"📨 Received from Retell: {interaction_type} (response_id: {response_id})")
+                logger.debug("📨 Received from Retell: %s (response_id: %s)", interaction_type, response_id)
                 
                 # Handle different interaction types  
                 response_type = request_data.get("response_type")
                 
                 # Handle ping_pong responses from Retell (don't respond to these)
                 if response_type == "ping_pong":
-                    print("🏓 Received ping_pong from Retell")
+                    logger.debug("🏓 Received ping_pong from Retell")
                     continue
                 
                 if interaction_type == "response_required":
@@ -75,160 +91,171 @@ async def llm_websocket(websocket: WebSocket, call_id: str):
                     user_input = ""
                     # Get the last user message quickly
                     for entry in reversed(transcript):
-                        if entry.get("role") == "user" and entry.get("content", "").strip():
-                            user_input = entry.get("content", "").strip()
-                            break
+                        if entry.get("role") == "user":
+                            content = (entry.get("content") or "").strip()
+                            if content:
+                                user_input = content
+                                break
                     
                     if user_input:
-                        # Build conversation context (exclude current user message to avoid duplication)
-                        conversation_history = []
-                        for entry in transcript[:-1]:  # Exclude the last message (current user input)
-                            if (entry.get("content") and 
-                                len(entry.get("content", "").strip()) > 0 and 
-                                entry.get("content", "").strip() != user_input):  # Double-check no duplication
-                                role = "assistant" if entry.get("role") == "agent" else "user"
-                                conversation_history.append({
-                                    "role": role,
-                                    "content": entry.get("content", "").strip()
-                                })
+                        # Fold only the entries added since the last turn into the context window
+                        # (exclude current user message to avoid duplication)
+                        for i in range(history_index, len(transcript) - 1):
+                            entry = transcript[i]
+                            content = entry.get("content")
+                            if not content:
+                                continue
+                            content = content.strip()
+                            if not content:
+                                continue
+                            role = "assistant" if entry.get("role") == "agent" else "user"
+                            conversation_history.append({"role": role, "content": content})
+                        history_index = max(history_index, len(transcript) - 1)
                         
-                        # Keep only last 6 messages (3 exchanges) for context while staying within token limits
-                        conversation_history = conversation_history[-6:]
+                        # Accumulated data provides context to the LLM
+                        accumulated_data = state.extracted_data
                         
-                        # Get accumulated data to provide context to LLM
-                        current_accumulated_data = active_calls.get(call_id, {}).get("extracted_data", {})
+                        response_id = request_data.get("response_id", 1)
+                        streamed_parts: List[str] = []
                         
-                        # Use combined response generation + data extraction in ONE API call
-                        response_content, extracted_data = await generate_llm_response_with_extraction(user_input, driver_name, load_number, conversation_history, current_accumulated_data)
-                        
-                        # Store extracted data AND transcript progressively (accumulate during conversation)
-                        if call_id not in active_calls:
-                            active_calls[call_id] = {"driver_name": driver_name, "load_number": load_number}
+                        def send_partial(text: str):
+                            # Retell appends content across frames with the same response_id
+                            streamed_parts.append(text)
+                            writer.send({
+                                "response_id": response_id,
+                                "content": text,
+                                "content_complete": False,
+                                "end_call": False
+                            })
                         
-                        # Update with newly extracted data
-                        if "extracted_data" not in active_calls[call_id]:
-                            active_calls[call_id]["extracted_data"] = {}
+                        # Use combined response generation + data extraction in ONE API call
+                        response_content, extracted_data = await generate_llm_response_with_extraction(user_input, driver_name, load_number, conversation_history, accumulated_data, on_text=send_partial)
                         
-                        # Merge new data with existing (latest data takes precedence)
-                        active_calls[call_id]["extracted_data"].update({
-                            k: v for k, v in extracted_data.items() 
-                            if v is not None and v != ""
-                        })
+                        merge_extracted_data(accumulated_data, extracted_data)
                         
                         # Store the full conversation transcript
-                        active_calls[call_id]["full_transcript"] = transcript
+                        state.full_transcript = transcript
+                        
+                        # This handler is the only writer for the call, so persist the local state
+                        # (a single store write - atomic in memory, one MULTI/EXEC in Redis)
+                        await call_store.set(call_id, state.to_dict())
                         
-                        print(f"💬 Stored transcript with {len(transcript)} messages")
+                        logger.info("💬 Stored transcript with %d messages", len(transcript))
                         
-                        print(f"📊 Extracted data: {extracted_data}")
-                        print(f"💾 Accumulated data: {active_calls[call_id]['extracted_data']}")
+                        logger.debug("📊 Extracted data: %s", extracted_data)
+                        logger.debug("💾 Accumulated data: %s", accumulated_data)
                         
                         # Check if the LLM wants to end the call (via tool calling)
-                        accumulated_data = active_calls[call_id]['extracted_data']
                         should_end = extracted_data.get("should_end_call", False)
                         
-                        print(f"🔍 LLM decision to end call: {should_end}")
+                        logger.debug("🔍 LLM decision to end call: %s", should_end)
                         if should_end:
-                            print(f"📋 Call ending reason: {extracted_data.get('reason', 'No reason provided')}")
-                        print(f"📋 Current accumulated data: {list(accumulated_data.keys())}")
+                            logger.info("📋 Call ending reason: %s", extracted_data.get('reason', 'No reason provided'))
+                        logger.debug("📋 Current accumulated data: %s", list(accumulated_data))
                         
-                        # Send response back to Retell
+                        # Close the response, sending whatever text wasn't already streamed
+                        streamed_text = "".join(streamed_parts)
+                        remaining = response_content[len(streamed_text):] if response_content.startswith(streamed_text) else ""
                         response = {
-                            "response_id": request_data.get("response_id", 1),
-                            "content": response_content,
+                            "response_id": response_id,
+                            "content": remaining,
                             "content_complete": True,
                             "end_call": should_end
                         }
                         
-                        await websocket.send_text(json.dumps(response))
-                        print(f"✅ Sent response: {response_content}")
+                        writer.send(response)
+                        logger.debug("✅ Sent response: %s", response_content)
                     
                 elif interaction_type == "update_only":
                     # Just an update, no response needed
-                    print("📊 Received update from Retell")
+                    logger.debug("📊 Received update from Retell")
                     
-            except asyncio.TimeoutError:
-                print("⏰ Timeout waiting for message from Retell AI (30s)")
-                continue
-            except WebSocketDisconnect:
-                print("🔌 WebSocket disconnected by client")
-                break
-            except Exception as e:
-                print(f"❌ Error in WebSocket loop: {e}")
+            except Exception:
+                logger.exception("❌ Error in WebSocket loop")
                 break
                 
-    except Exception as e:
-        print(f"❌ WebSocket error: {e}")
+    except Exception:
+        logger.exception("❌ WebSocket error")
     finally:
-        # Cancel ping task
-        if 'ping_task' in locals():
-            print("🛑 Cancelling ping task...")
-            ping_task.cancel()
-            try:
-                await ping_task
-            except asyncio.CancelledError:
-                print("✅ Ping task cancelled successfully")
+        await writer.close()
         
         # Finalize call when WebSocket closes
-        print(f"🏁 WebSocket connection closed for call: {call_id}")
+        logger.info("🏁 WebSocket connection closed for call: %s", call_id)
         await finalize_call_on_disconnect(call_id)
 
-async def send_ping_pong(websocket: WebSocket):
-    """Send ping_pong events every 2 seconds to maintain WebSocket connection"""
-    try:
-        print("🏓 Starting ping_pong task...")
+async def iter_frames(websocket: WebSocket):
+    """Yield raw frame payloads from Retell until the client disconnects"""
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            logger.info("🔌 WebSocket disconnected by client")
+            return
+        yield message.get("text") or message.get("bytes")
+
+class FrameWriter:
+    """Single outbound writer for a Retell connection
+
+    Frames are queued and sent in order by one task, which also sends a
+    ping_pong whenever nothing has been queued for PING_PONG_INTERVAL - so
+    keepalives never race a response frame and continue during LLM turns.
+    """
+
+    def __init__(self, websocket: WebSocket):
+        self._websocket = websocket
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def send(self, frame: Dict[str, Any]):
+        """Queue a frame for sending (never blocks the caller)"""
+        self._queue.put_nowait(orjson.dumps(frame).decode())
+
+    async def _run(self):
         while True:
-            await asyncio.sleep(2)
-            ping_pong_message = {
-                "response_type": "ping_pong",
-                "timestamp": int(time.time() * 1000)  # Current time in milliseconds
-            }
             try:
-                await websocket.send_text(json.dumps(ping_pong_message))
-                print(f"🏓 Sent ping_pong at {ping_pong_message['timestamp']}")
-            except ConnectionResetError:
-                print("🔌 WebSocket connection reset during ping_pong")
-                break
-            except Exception as e:
-                print(f"❌ Failed to send ping_pong: {e}")
-                break
-    except asyncio.CancelledError:
-        print("🛑 Ping pong task cancelled")
-    except Exception as e:
-        print(f"❌ Ping pong error: {e}")
+                frame = await asyncio.wait_for(self._queue.get(), timeout=PING_PONG_INTERVAL)
+            except asyncio.TimeoutError:
+                await send_ping_pong(self._websocket)
+                continue
+            await self._websocket.send_text(frame)
 
-async def generate_first_message_simple(driver_name: str, load_number: str) -> str:
+    async def close(self):
+        """Stop the writer task"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.debug("Writer stopped with error: %s", e)
+
+async def send_ping_pong(websocket: WebSocket):
+    """Send a single ping_pong keepalive event"""
+    timestamp = int(time.time() * 1000)  # Current time in milliseconds
+    await websocket.send_text(f"{PING_PONG_PREFIX}{timestamp}}}")
+    logger.debug("🏓 Sent ping_pong at %d", timestamp)
+
+# Shared async OpenAI client (created lazily so a missing key doesn't break imports)
+_openai_client = None
+
+def get_openai_client() -> AsyncOpenAI:
+    """Get or create the shared OpenAI client"""
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, timeout=10)
+    return _openai_client
+
+def generate_first_message_simple(driver_name: str, load_number: str) -> str:
     """Generate the first message using simple template for speed"""
-    try:
-        # Use simple template for speed - no OpenAI call needed for first message
-        return f"Hi {driver_name}, this is Dispatch calling about load {load_number}. Can you give me an update on your status?"
-        
-    except Exception as e:
-        print(f"❌ Error generating first message: {e}")
-        return f"Hi {driver_name}, this is Dispatch calling about load {load_number}. How are you doing?"
+    # Use simple template for speed - no OpenAI call needed for first message
+    return f"Hi {driver_name}, this is Dispatch calling about load {load_number}. Can you give me an update on your status?"
 
-async def generate_llm_response_with_extraction(user_input: str, driver_name: str, load_number: str, conversation_history: List[Dict[str, Any]] = None, accumulated_data: Dict[str, Any] = None) -> tuple[str, Dict[str, Any]]:
-    """Generate response AND extract structured data in one API call using tool calling"""
-    try:
-        import openai
-        
-        client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
-        
-        # Build context about what data we already have
-        accumulated_info = ""
-        if accumulated_data:
-            info_parts = []
-            if accumulated_data.get("current_location"):
-                info_parts.append(f"Location: {accumulated_data['current_location']}")
-            if accumulated_data.get("driver_status"):
-                info_parts.append(f"Status: {accumulated_data['driver_status']}")
-            if accumulated_data.get("eta"):
-                info_parts.append(f"ETA: {accumulated_data['eta']}")
-            if info_parts:
-                accumulated_info = f"\n\nINFORMATION ALREADY COLLECTED:\n" + "\n".join(f"- {info}" for info in info_parts)
-        
-        # Enhanced system prompt for intelligent tool selection
-        system_prompt = f"""You are a professional logistics dispatcher talking to {driver_name} about load {load_number}.{accumulated_info}
+# Enhanced system prompt for intelligent tool selection (filled in per turn)
+SYSTEM_PROMPT_TEMPLATE = """You are a professional logistics dispatcher talking to {driver_name} about load {load_number}.{accumulated_info}
 
 CRITICAL DECISION: Choose the correct tool based on the situation and conversation context:
 
@@ -256,6 +283,307 @@ TOOL SELECTION:
 
 Choose the appropriate tool and provide both a response and extract relevant data."""
 
+# Specialized tools - LLM chooses which one to call based on situation
+ROUTINE_CHECKIN_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "handle_routine_checkin",
+        "description": "Handle normal driver check-in conversation - ask about location, ETA, status updates",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "response_text": {
+                    "type": "string",
+                    "description": "Professional dispatcher response asking for location, ETA, or status updates"
+                },
+                "call_outcome": {
+                    "type": "string",
+                    "description": "Current call status: 'In-Transit Update' or 'Arrival Confirmation'"
+                },
+                "driver_status": {
+                    "type": "string",
+                    "description": "Driver's current status: 'Driving', 'Delayed', 'Arrived', etc."
+                },
+                "current_location": {
+                    "type": "string",
+                    "description": "Specific location mentioned (highway, city, mile marker)"
+                },
+                "eta": {
+                    "type": "string",
+                    "description": "Estimated arrival time if provided"
+                },
+                "issues_delays": {
+                    "type": "string",
+                    "description": "Any non-emergency issues or delays mentioned"
+                },
+                "confidence": {
+                    "type": "number",
+                    "description": "Confidence in extracted data (0.0-1.0)",
+                    "minimum": 0.0,
+                    "maximum": 1.0
+                }
+            },
+            "required": ["response_text", "confidence"]
+        }
+    }
+}
+
+EMERGENCY_PROTOCOL_TOOL = {
+    "type": "function", 
+    "function": {
+        "name": "handle_emergency_protocol",
+        "description": "EMERGENCY DETECTED - Immediately gather critical information and escalate to human dispatcher",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "response_text": {
+                    "type": "string",
+                    "description": "Emergency response: acknowledge, ask if safe, get location, escalate to human dispatcher"
+                },
+                "call_outcome": {
+                    "type": "string",
+                    "description": "Must be 'Emergency Detected'"
+                },
+                "emergency_type": {
+                    "type": "string", 
+                    "description": "Type of emergency: 'Accident', 'Breakdown', 'Medical', or 'Other'"
+                },
+                "emergency_location": {
+                    "type": "string",
+                    "description": "Specific location of emergency (highway, mile marker, etc.)"
+                },
+                "escalation_status": {
+                    "type": "string",
+                    "description": "Must be 'Escalation Flagged' - human dispatcher will call back"
+                },
+                "driver_safety_status": {
+                    "type": "string",
+                    "description": "Is the driver safe? 'Safe', 'Injured', 'Unknown'"
+                },
+                "immediate_assistance_needed": {
+                    "type": "boolean",
+                    "description": "Does driver need immediate emergency services?"
+                },
+                "confidence": {
+                    "type": "number",
+                    "description": "Confidence in emergency assessment (0.0-1.0)",
+                    "minimum": 0.0,
+                    "maximum": 1.0
+                }
+            },
+            "required": ["response_text", "call_outcome", "emergency_type", "escalation_status", "confidence"]
+        }
+    }
+}
+
+END_CALL_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "end_call",
+        "description": "END THE CALL - Use when you have collected all required information (location + status + ETA for routine, or emergency details)",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "response_text": {
+                    "type": "string",
+                    "description": "Final farewell message to end the call professionally (e.g., 'Thank you for the update, drive safely!')"
+                },
+                "call_complete": {
+                    "type": "boolean",
+                    "description": "Must be true - indicates call should end"
+                },
+                "reason": {
+                    "type": "string",
+                    "description": "Why the call is ending: 'All data collected', 'Emergency escalated', 'Driver unresponsive', etc."
+                },
+                "confidence": {
+                    "type": "number",
+                    "description": "Confidence that call should end (0.0-1.0)",
+                    "minimum": 0.0,
+                    "maximum": 1.0
+                }
+            },
+            "required": ["response_text", "call_complete", "reason", "confidence"]
+        }
+    }
+}
+
+LLM_TOOLS = [ROUTINE_CHECKIN_TOOL, EMERGENCY_PROTOCOL_TOOL, END_CALL_TOOL]
+
+# Fixed emergency vocabulary, compiled once into a single alternation so each turn
+# is one linear scan of the driver's words
+EMERGENCY_KEYWORDS = (
+    "accident", "crash", "crashed", "collision", "breakdown", "broke down", "broken down",
+    "medical", "injury", "injured", "hurt", "bleeding", "stranded",
+    "can't breathe", "engine smoking", "emergency", "help me", "911", "ambulance"
+)
+EMERGENCY_PATTERN = re.compile(
+    r"\b(?:" + "|".join(re.escape(k) for k in sorted(EMERGENCY_KEYWORDS, key=len, reverse=True)) + r")\b",
+    re.IGNORECASE
+)
+EMERGENCY_HINT = "\n\nNOTE: The driver's latest message contains emergency keywords - treat this as a possible emergency."
+
+def detect_emergency_keywords(text: str) -> bool:
+    """Cheap local check for emergency language in the driver's message"""
+    return EMERGENCY_PATTERN.search(text) is not None
+
+# Once a routine check-in has all of these, the call can end without another LLM round-trip
+ROUTINE_REQUIRED_FIELDS = ("current_location", "driver_status", "eta")
+FAREWELL_MESSAGE = "Thanks for the update, drive safely!"
+
+# Emergency calls can end once these details have been gathered and escalated
+EMERGENCY_REQUIRED_FIELDS = ("emergency_type", "emergency_location", "escalation_status")
+
+# Single-tool request when the outcome is already known - smaller payload, no tool reasoning
+FORCE_END_CALL = ([END_CALL_TOOL], {"type": "function", "function": {"name": "end_call"}})
+LET_MODEL_CHOOSE = (LLM_TOOLS, "required")
+
+def decide_tool(accumulated_data: Optional[Dict[str, Any]]) -> tuple[List[Dict[str, Any]], Any]:
+    """Pick the tools/tool_choice for this turn from what the LLM has already confirmed
+
+    Keyword hits only bias the prompt (EMERGENCY_HINT) - they are too coarse to force
+    the emergency tool ("accident ahead, I'm delayed" is a routine update).
+    """
+    accumulated_data = accumulated_data or {}
+    # Emergency details (incl. escalation) only come from the emergency tool, so the escalation is done
+    if all(accumulated_data.get(k) for k in EMERGENCY_REQUIRED_FIELDS):
+        return FORCE_END_CALL
+    return LET_MODEL_CHOOSE
+
+# Replies that carry no new information - only these may end a complete routine call without the LLM
+ACKNOWLEDGMENT_PATTERN = re.compile(
+    r"^(?:(?:ok|okay|yes|yeah|yep|sure|thanks|thank you|alright|all right|got it|sounds good|"
+    r"you too|no problem|bye|goodbye)[\s.,!]*)+$",
+    re.IGNORECASE
+)
+
+def is_bare_acknowledgment(text: str) -> bool:
+    """True when the driver's message is only an acknowledgment ("okay, thanks")"""
+    return ACKNOWLEDGMENT_PATTERN.match(text.strip()) is not None
+
+def merge_extracted_data(accumulated_data: Dict[str, Any], extracted_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge a turn's extracted fields into accumulated_data in place (latest data takes precedence)"""
+    for k, v in extracted_data.items():
+        if v is not None and v != "":
+            accumulated_data[k] = v
+    return accumulated_data
+
+def routine_checkin_complete(accumulated_data: Optional[Dict[str, Any]]) -> bool:
+    """True when a non-emergency call already has location, status and ETA"""
+    # is_emergency is overwritten every turn; emergency details stick once the emergency tool ran
+    if not accumulated_data or accumulated_data.get("emergency_type") or accumulated_data.get("escalation_status"):
+        return False
+    return all(accumulated_data.get(k) for k in ROUTINE_REQUIRED_FIELDS)
+
+# JSON string escapes other than \uXXXX
+JSON_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+class ResponseTextExtractor:
+    """Incrementally decode the response_text value from streamed tool-call arguments
+
+    feed() takes each argument fragment as it arrives and returns whatever new
+    text of response_text can be decoded so far, so speech can start before
+    the rest of the tool call (the extracted fields) has been generated.
+    """
+
+    KEY_PATTERN = re.compile(r'"response_text"\s*:\s*"')
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos: Optional[int] = None
+        self.done = False
+
+    def feed(self, fragment: str) -> str:
+        if self.done:
+            return ""
+        self._buffer += fragment
+        if self._pos is None:
+            match = self.KEY_PATTERN.search(self._buffer)
+            if not match:
+                return ""
+            self._pos = match.end()
+        
+        buf = self._buffer
+        end = len(buf)
+        i = self._pos
+        out = []
+        while i < end:
+            ch = buf[i]
+            if ch == '"':
+                self.done = True
+                i += 1
+                break
+            if ch != "\\":
+                out.append(ch)
+                i += 1
+                continue
+            # Escape sequence - wait for the rest of it if it was split across fragments
+            if i + 1 >= end:
+                break
+            esc = buf[i + 1]
+            if esc != "u":
+                out.append(JSON_ESCAPES.get(esc, esc))
+                i += 2
+                continue
+            if i + 6 > end:
+                break
+            code = int(buf[i + 2:i + 6], 16)
+            if 0xD800 <= code < 0xDC00:
+                # High surrogate - combine with the following \uXXXX low surrogate
+                if i + 12 > end:
+                    break
+                low = int(buf[i + 8:i + 12], 16)
+                out.append(chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)))
+                i += 12
+            else:
+                out.append(chr(code))
+                i += 6
+        self._pos = i
+        return "".join(out)
+
+async def generate_llm_response_with_extraction(user_input: str, driver_name: str, load_number: str, conversation_history: List[Dict[str, Any]] = None, accumulated_data: Dict[str, Any] = None, on_text: Optional[Callable[[str], None]] = None) -> tuple[str, Dict[str, Any]]:
+    """Generate response AND extract structured data in one API call using tool calling
+
+    The completion is streamed; if on_text is given it is called with each new
+    piece of response_text as soon as it is decoded.
+    """
+    try:
+        # Everything needed is already collected and the driver only acknowledged - end locally
+        # instead of asking the LLM to call end_call. Anything else (e.g. a corrected ETA) is extracted first.
+        if routine_checkin_complete(accumulated_data) and is_bare_acknowledgment(user_input):
+            logger.info("🔚 All routine data collected, ending call without LLM round-trip")
+            return FAREWELL_MESSAGE, {
+                "tool_used": "end_call",
+                "is_emergency": False,
+                "should_end_call": True,
+                "reason": "All data collected",
+                "confidence": 1.0
+            }
+        
+        emergency_hint = detect_emergency_keywords(user_input)
+        client = get_openai_client()
+        
+        # Build context about what data we already have
+        accumulated_info = ""
+        if accumulated_data:
+            info_parts = []
+            if accumulated_data.get("current_location"):
+                info_parts.append(f"Location: {accumulated_data['current_location']}")
+            if accumulated_data.get("driver_status"):
+                info_parts.append(f"Status: {accumulated_data['driver_status']}")
+            if accumulated_data.get("eta"):
+                info_parts.append(f"ETA: {accumulated_data['eta']}")
+            if info_parts:
+                accumulated_info = f"\n\nINFORMATION ALREADY COLLECTED:\n" + "\n".join(f"- {info}" for info in info_parts)
+        if emergency_hint:
+            accumulated_info += EMERGENCY_HINT
+        
+        system_prompt = SYSTEM_PROMPT_TEMPLATE.format(
+            driver_name=driver_name,
+            load_number=load_number,
+            accumulated_info=accumulated_info
+        )
+
         # Build messages with conversation history
         messages = [{"role": "system", "content": system_prompt}]
         
@@ -267,155 +595,51 @@ Choose the appropriate tool and provide both a response and extract relevant dat
         messages.append({"role": "user", "content": user_input})
         
         # Debug: Log the conversation context being sent to OpenAI
-        print(f"🧠 Sending to OpenAI - Total messages: {len(messages)}")
-        print(f"📝 Context messages: {len(conversation_history)}")
-        for i, msg in enumerate(messages[-3:]):  # Show last 3 messages
-            role_emoji = "🤖" if msg["role"] == "assistant" else "👤" if msg["role"] == "user" else "⚙️"
-            content_preview = msg["content"][:50] + "..." if len(msg["content"]) > 50 else msg["content"]
-            print(f"  {role_emoji} {msg['role']}: {content_preview}")
-
-        # Two specialized tools - LLM chooses which one to call based on situation
-        routine_checkin_tool = {
-            "type": "function",
-            "function": {
-                "name": "handle_routine_checkin",
-                "description": "Handle normal driver check-in conversation - ask about location, ETA, status updates",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "response_text": {
-                            "type": "string",
-                            "description": "Professional dispatcher response asking for location, ETA, or status updates"
-                        },
-                        "call_outcome": {
-                            "type": "string",
-                            "description": "Current call status: 'In-Transit Update' or 'Arrival Confirmation'"
-                        },
-                        "driver_status": {
-                            "type": "string",
-                            "description": "Driver's current status: 'Driving', 'Delayed', 'Arrived', etc."
-                        },
-                        "current_location": {
-                            "type": "string",
-                            "description": "Specific location mentioned (highway, city, mile marker)"
-                        },
-                        "eta": {
-                            "type": "string",
-                            "description": "Estimated arrival time if provided"
-                        },
-                        "issues_delays": {
-                            "type": "string",
-                            "description": "Any non-emergency issues or delays mentioned"
-                        },
-                        "confidence": {
-                            "type": "number",
-                            "description": "Confidence in extracted data (0.0-1.0)",
-                            "minimum": 0.0,
-                            "maximum": 1.0
-                        }
-                    },
-                    "required": ["response_text", "confidence"]
-                }
-            }
-        }
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("🧠 Sending to OpenAI - Total messages: %d", len(messages))
+            logger.debug("📝 Context messages: %d", len(conversation_history))
+            for msg in messages[-3:]:  # Show last 3 messages
+                role_emoji = "🤖" if msg["role"] == "assistant" else "👤" if msg["role"] == "user" else "⚙️"
+                content_preview = msg["content"][:50] + "..." if len(msg["content"]) > 50 else msg["content"]
+                logger.debug("  %s %s: %s", role_emoji, msg['role'], content_preview)
 
-        emergency_protocol_tool = {
-            "type": "function", 
-            "function": {
-                "name": "handle_emergency_protocol",
-                "description": "EMERGENCY DETECTED - Immediately gather critical information and escalate to human dispatcher",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "response_text": {
-                            "type": "string",
-                            "description": "Emergency response: acknowledge, ask if safe, get location, escalate to human dispatcher"
-                        },
-                        "call_outcome": {
-                            "type": "string",
-                            "description": "Must be 'Emergency Detected'"
-                        },
-                        "emergency_type": {
-                            "type": "string", 
-                            "description": "Type of emergency: 'Accident', 'Breakdown', 'Medical', or 'Other'"
-                        },
-                        "emergency_location": {
-                            "type": "string",
-                            "description": "Specific location of emergency (highway, mile marker, etc.)"
-                        },
-                        "escalation_status": {
-                            "type": "string",
-                            "description": "Must be 'Escalation Flagged' - human dispatcher will call back"
-                        },
-                        "driver_safety_status": {
-                            "type": "string",
-                            "description": "Is the driver safe? 'Safe', 'Injured', 'Unknown'"
-                        },
-                        "immediate_assistance_needed": {
-                            "type": "boolean",
-                            "description": "Does driver need immediate emergency services?"
-                        },
-                        "confidence": {
-                            "type": "number",
-                            "description": "Confidence in emergency assessment (0.0-1.0)",
-                            "minimum": 0.0,
-                            "maximum": 1.0
-                        }
-                    },
-                    "required": ["response_text", "call_outcome", "emergency_type", "escalation_status", "confidence"]
-                }
-            }
-        }
-
-        end_call_tool = {
-            "type": "function",
-            "function": {
-                "name": "end_call",
-                "description": "END THE CALL - Use when you have collected all required information (location + status + ETA for routine, or emergency details)",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "response_text": {
-                            "type": "string",
-                            "description": "Final farewell message to end the call professionally (e.g., 'Thank you for the update, drive safely!')"
-                        },
-                        "call_complete": {
-                            "type": "boolean",
-                            "description": "Must be true - indicates call should end"
-                        },
-                        "reason": {
-                            "type": "string",
-                            "description": "Why the call is ending: 'All data collected', 'Emergency escalated', 'Driver unresponsive', etc."
-                        },
-                        "confidence": {
-                            "type": "number",
-                            "description": "Confidence that call should end (0.0-1.0)",
-                            "minimum": 0.0,
-                            "maximum": 1.0
-                        }
-                    },
-                    "required": ["response_text", "call_complete", "reason", "confidence"]
-                }
-            }
-        }
-
-        response = client.chat.completions.create(
+        # Force a single tool when the state already decides it, otherwise require one of the three
+        tools, tool_choice = decide_tool(accumulated_data)
+        
+        stream = await client.chat.completions.create(
             model="gpt-4.1-mini",
             messages=messages,
-            tools=[routine_checkin_tool, emergency_protocol_tool, end_call_tool],
-            tool_choice="required",  # Force LLM to always use one of the tools
+            tools=tools,
+            tool_choice=tool_choice,
             service_tier="priority",  # Use priority tier for faster processing
             temperature=0.3,
-            timeout=10  # Slightly longer for tool calling
+            timeout=10,  # Slightly longer for tool calling
+            stream=True
         )
         
+        # Collect the first tool call while forwarding response_text as it streams in
+        tool_name = None
+        argument_parts: List[str] = []
+        text_extractor = ResponseTextExtractor()
+        async for chunk in stream:
+            if not chunk.choices or not chunk.choices[0].delta.tool_calls:
+                continue
+            for tool_delta in chunk.choices[0].delta.tool_calls:
+                if tool_delta.index != 0 or tool_delta.function is None:
+                    continue
+                if tool_delta.function.name:
+                    tool_name = tool_delta.function.name
+                fragment = tool_delta.function.arguments
+                if fragment:
+                    argument_parts.append(fragment)
+                    if on_text is not None:
+                        text = text_extractor.feed(fragment)
+                        if text:
+                            on_text(text)
+        
         # Extract both response and data - LLM chose the appropriate tool
-        if response.choices[0].message.tool_calls:
-            tool_call = response.choices[0].message.tool_calls[0]
-            tool_name = tool_call.function.name
-            
-            import json
-            extracted_data = json.loads(tool_call.function.arguments)
+        if tool_name:
+            extracted_data = orjson.loads("".join(argument_parts))
             response_text = extracted_data.pop("response_text", "I understand. Can you provide more details?")
             
             # Add metadata about which tool was used
@@ -423,10 +647,18 @@ Choose the appropriate tool and provide both a response and extract relevant dat
             extracted_data["is_emergency"] = (tool_name == "handle_emergency_protocol")
             extracted_data["should_end_call"] = (tool_name == "end_call")
             
-            print(f"🔧 LLM chose tool: {tool_name}")
-            print(f"🚨 Emergency detected: {extracted_data['is_emergency']}")
+            # With this turn's data the routine check-in is complete - say goodbye now rather than on another LLM turn
+            if tool_name == "handle_routine_checkin" and routine_checkin_complete(
+                merge_extracted_data(dict(accumulated_data or {}), extracted_data)
+            ):
+                response_text = f"{response_text} {FAREWELL_MESSAGE}"
+                extracted_data["should_end_call"] = True
+                extracted_data["reason"] = "All data collected"
+            
+            logger.info("🔧 LLM chose tool: %s", tool_name)
+            logger.debug("🚨 Emergency detected: %s", extracted_data['is_emergency'])
             if extracted_data["should_end_call"]:
-                print(f"🔚 LLM wants to end call: {extracted_data.get('reason', 'No reason provided')}")
+                logger.info("🔚 LLM wants to end call: %s", extracted_data.get('reason', 'No reason provided'))
             
             return response_text, extracted_data
         
@@ -438,7 +670,7 @@ Choose the appropriate tool and provide both a response and extract relevant dat
         }
         
     except Exception as e:
-        print(f"❌ Error in response generation with extraction: {e}")
+        logger.exception("❌ Error in response generation with extraction")
         return "I understand. Can you provide more details about your current status?", {
             "is_emergency": False,
             "confidence": 0.1,
@@ -452,19 +684,21 @@ async def generate_llm_response_fallback(user_input: str, driver_name: str, load
     return response_text
 
 
+# Database handle, resolved on first disconnect
+_db: Optional[DatabaseService] = None
+
 async def finalize_call_on_disconnect(call_id: str):
     """Finalize call when WebSocket disconnects"""
+    global _db
     try:
-        from app.services.database import get_database_service
-        
-        # Get accumulated data from active_calls
-        call_data = active_calls.get(call_id, {})
+        # Get accumulated data from the call store
+        call_data = await call_store.get(call_id)
         extracted_data = call_data.get("extracted_data", {})
         stored_transcript = call_data.get("full_transcript", [])
         
-        print(f"🏁 Finalizing call {call_id}")
-        print(f"📊 Final extracted data: {extracted_data}")
-        print(f"💬 Final transcript: {len(stored_transcript)} messages")
+        logger.info("🏁 Finalizing call %s", call_id)
+        logger.debug("📊 Final extracted data: %s", extracted_data)
+        logger.info("💬 Final transcript: %d messages", len(stored_transcript))
         
         # Create structured data summary
         structured_data = extracted_data.copy() if extracted_data else {}
@@ -472,35 +706,29 @@ async def finalize_call_on_disconnect(call_id: str):
         # Add call completion info
         structured_data.update({
             "call_outcome": extracted_data.get("call_outcome", "Call Completed"),
-            "summary": f"Call completed with {call_data.get('driver_name', 'driver')} about load {call_data.get('load_number', 'N/A')}"
+            "summary": build_call_summary(call_data)
         })
         
-        # Update database record
-        db = get_database_service()
-        update_data = {
+        # Update database record - structured fields and completion info in a single UPDATE
+        if _db is None:
+            # First use creates the pool, which connects to the database - not on the event loop
+            _db = await asyncio.to_thread(get_database_service)
+        update_data = {f: extracted_data[f] for f in STRUCTURED_FIELDS & extracted_data.keys()}
+        update_data |= {
             "call_status": "completed",
             "call_ended_at": time.time(),
             "full_transcript": stored_transcript,
             "structured_data": structured_data
         }
         
-        # Add individual fields from extracted data
-        for field in ["call_outcome", "driver_status", "current_location", "eta", 
-                     "emergency_type", "emergency_location", "escalation_status"]:
-            if field in extracted_data:
-                update_data[field] = extracted_data[field]
-        
-        success = await db.update_call_result(call_id, update_data)
+        success = await _db.update_call_result(call_id, update_data)
         
         if success:
-            print(f"✅ Call {call_id} finalized successfully")
+            logger.info("✅ Call %s finalized successfully", call_id)
         else:
-            print(f"❌ Failed to finalize call {call_id}")
+            logger.error("❌ Failed to finalize call %s", call_id)
         
-        # Clean up active call data
-        if call_id in active_calls:
-            del active_calls[call_id]
-            print(f"🧹 Cleaned up active call data for {call_id}")
+        # Call data is left to expire via the store TTL so the recording webhook can still use it
             
-    except Exception as e:
-        print(f"❌ Error finalizing call {call_id}: {e}")
\ No newline at end of file
+    except Exception:
+        logger.exception("❌ Error finalizing call %s", call_id)
\ No newline at end of file
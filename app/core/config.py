@@ -23,6 +23,14 @@ class Config:
     DB_HOST = os.getenv("host")
     DB_PORT = os.getenv("port", "5432")
     DB_NAME = os.getenv("dbname", "postgres")
+    DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 2))
+    DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 20))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 5))
+    DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", 5))
+    
+    # Call State Store (Redis is required when running more than one worker)
+    REDIS_URL = os.getenv("REDIS_URL")
+    CALL_STATE_TTL = int(os.getenv("CALL_STATE_TTL", 600))
     
     # Server Configuration
     HOST = os.getenv("HOST", "0.0.0.0")
@@ -36,6 +44,7 @@ class Config:
     PROJECT_NAME = "AI Voice Agent Tool"
     VERSION = "1.0.0"
     DEBUG = True
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
     ALLOWED_HOSTS = [
         "http://localhost:3000",
         "http://127.0.0.1:3000"
@@ -0,0 +1,28 @@
+"""
+HTTP Caching
+ETag / Cache-Control helpers for idempotent GET endpoints
+"""
+
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+# Always revalidate (the ETag makes that a cheap 304) and keep driver data out of shared caches
+CACHE_CONTROL = "private, no-cache"
+
+def apply_cache_headers(request: Request, response: Response, payload: BaseModel) -> Optional[Response]:
+    """Tag a response with an ETag and Cache-Control header
+
+    Returns a 304 response when the client already holds the current version,
+    otherwise None and the caller returns its payload as usual.
+    """
+    etag = '"%s"' % hashlib.blake2b(payload.model_dump_json().encode(), digest_size=16).hexdigest()
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,44 @@
+"""
+Logging Configuration
+Queue-based logging so request handlers never block on stream writes
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+from typing import Optional
+
+from app.core.config import settings
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def setup_logging():
+    """Route all app logging through a QueueHandler drained by a background thread"""
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue: queue.Queue = queue.Queue(-1)
+
+    # The listener thread owns the (potentially slow) stderr stream
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+    # Handlers only enqueue the record
+    app_logger = logging.getLogger("app")
+    app_logger.setLevel(settings.LOG_LEVEL)
+    app_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    app_logger.propagate = False
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
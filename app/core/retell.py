@@ -0,0 +1,24 @@
+"""
+Retell Client
+Shared Retell SDK client backed by a persistent keep-alive HTTP connection pool
+"""
+
+import httpx
+from retell import Retell
+
+from app.core.config import settings
+
+# Reuse TCP/TLS connections to api.retellai.com across requests
+RETELL_HTTP_LIMITS = httpx.Limits(
+    max_connections=50,
+    max_keepalive_connections=20,
+    keepalive_expiry=30
+)
+
+def create_retell_client() -> Retell:
+    """Create a Retell client that shares one pooled HTTP/2 session"""
+    http_client = httpx.Client(http2=True, limits=RETELL_HTTP_LIMITS)
+    return Retell(api_key=settings.RETELL_API_KEY, http_client=http_client)
+
+# Single shared client so all endpoints reuse the same connection pool
+retell_client = create_retell_client()
@@ -3,21 +3,76 @@ AI Voice Agent FastAPI Application
 Main application entry point
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
+import asyncio
+import logging
 import os
 
 from app.core.config import settings
+from app.core.logging_config import setup_logging
+from app.core.retell import retell_client
+from app.services.call_store import close_call_store
+from app.services.database import PoolExhausted, close_database_service, get_database_service
+
+# Configure non-blocking logging before anything starts emitting records
+setup_logging()
 
 # Create FastAPI application
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="AI Voice Agent Tool for Logistics Dispatch",
     version=settings.VERSION,
-    openapi_url="/openapi.json"
+    openapi_url="/openapi.json",
+    default_response_class=ORJSONResponse
 )
 
+logger = logging.getLogger(__name__)
+
+class UnhandledExceptionMiddleware:
+    """Log unexpected errors once and return a generic 500 without leaking internals
+
+    Plain ASGI rather than @app.middleware("http"), which would add a task group and
+    memory stream to every request and interfere with streaming responses.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        response_started = False
+        
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            # Too late to replace the response - let the server close the connection
+            if response_started:
+                raise
+            logger.exception("Unhandled error on %s %s", scope["method"], scope["path"])
+            response = ORJSONResponse(status_code=500, content={"detail": "Internal server error"})
+            await response(scope, receive, send)
+
+# Added before CORSMiddleware so it runs inside it - 500s keep their CORS headers,
+# and the error never reaches ServerErrorMiddleware (which would log it a second time)
+app.add_middleware(UnhandledExceptionMiddleware)
+
+@app.exception_handler(PoolExhausted)
+async def pool_exhausted_handler(request: Request, exc: PoolExhausted):
+    """Tell clients to retry when every database connection is busy"""
+    logger.warning("⚠️ %s %s: %s", request.method, request.url.path, exc)
+    return ORJSONResponse(status_code=503, content={"detail": "Database busy, retry shortly"}, headers={"Retry-After": "1"})
+
 # Set up CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -33,6 +88,56 @@ app.include_router(agents.router, prefix="", tags=["agents"])
 app.include_router(calls.router, prefix="", tags=["calls"])
 app.include_router(websocket.router, prefix="", tags=["websocket"])
 
+# Upper bound for the Retell warm-up; it runs in the background and never delays boot
+RETELL_WARM_UP_TIMEOUT = 10.0
+# Upper bound for opening the database pool and pinging it during startup
+DB_WARM_UP_TIMEOUT = 10.0
+_warm_up_tasks = set()
+
+async def warm_up_retell():
+    """Prime the published agent cache used by /create-test-call"""
+    try:
+        await asyncio.wait_for(calls.get_published_agent_info(), timeout=RETELL_WARM_UP_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("Retell warm-up timed out after %.0fs", RETELL_WARM_UP_TIMEOUT)
+    except Exception as e:
+        logger.warning("Retell warm-up failed: %s", e)
+
+@app.on_event("startup")
+async def warm_up_connections():
+    """Open the Retell and database connections before the first request needs them"""
+    # Keep a reference so the background task isn't garbage collected mid-flight
+    task = asyncio.create_task(warm_up_retell())
+    _warm_up_tasks.add(task)
+    task.add_done_callback(_warm_up_tasks.discard)
+    
+    try:
+        # Creating the pool opens DB_POOL_MIN_SIZE connections - keep those blocking connects off the event loop
+        await asyncio.wait_for(asyncio.to_thread(_open_database), timeout=DB_WARM_UP_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("Database warm-up timed out after %.0fs", DB_WARM_UP_TIMEOUT)
+    except Exception as e:
+        logger.warning("Database warm-up failed: %s", e)
+
+def _open_database():
+    """Create the database pool and verify connectivity"""
+    get_database_service().ping()
+
+@app.on_event("shutdown")
+def close_retell_client():
+    """Close the shared Retell HTTP connection pool"""
+    retell_client.close()
+
+@app.on_event("shutdown")
+def close_database_pool():
+    """Close pooled database connections"""
+    close_database_service()
+
+@app.on_event("shutdown")
+async def close_call_state_store():
+    """Close the call store (Redis connection pool when configured)"""
+    await close_call_store()
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -49,10 +154,12 @@ if os.path.exists("frontend/build"):
     app.mount("/", StaticFiles(directory="frontend/build", html=True), name="static")
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
     uvicorn.run(
         "app.main:app",
         host=settings.HOST,
         port=settings.PORT,
-        reload=settings.DEBUG
+        reload=settings.DEBUG,
+        loop="asyncio" if sys.platform == "win32" else "uvloop"
     )
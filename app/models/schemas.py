@@ -3,6 +3,7 @@ Pydantic Schemas
 Request/Response models for API endpoints
 """
 
+from datetime import datetime
 from typing import Dict, List, Any, Optional
 from pydantic import BaseModel
 
@@ -27,7 +28,7 @@ class CallResultResponse(BaseModel):
     id: str
     call_id: str
     driver_name: str
-    phone_number: str
+    phone_number: Optional[str] = None
     load_number: str
     call_status: str
     call_outcome: Optional[str] = None
@@ -39,13 +40,59 @@ class CallResultResponse(BaseModel):
     escalation_status: Optional[str] = None
     full_transcript: Optional[List[Dict[str, Any]]] = None
     structured_data: Optional[Dict[str, Any]] = None
+    call_metadata: Optional[Dict[str, Any]] = None
+    call_started_at: Optional[str] = None
+    call_ended_at: Optional[str] = None
     created_at: str
 
+class CallHistoryResponse(BaseModel):
+    success: bool
+    calls: List[CallResultResponse]
+
+class ConversationMessage(BaseModel):
+    role: str
+    content: str
+    sequence_number: int
+    timestamp: Optional[str] = None
+    tool_name: Optional[str] = None
+    tool_arguments: Optional[Dict[str, Any]] = None
+    tool_result: Optional[Any] = None
+
+class CallDetails(CallResultResponse):
+    agent_configuration_id: Optional[str] = None
+    updated_at: Optional[str] = None
+    tool_calls: List[Dict[str, Any]] = []
+    conversation_messages: List[Dict[str, Any]] = []
+    full_conversation: List[ConversationMessage] = []
+
+class CallDetailsResponse(BaseModel):
+    success: bool
+    call: CallDetails
+
+class RecordingWebhookResponse(BaseModel):
+    success: bool
+    structured_data: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
 class AgentConfigResponse(BaseModel):
     success: bool
     config: Optional[Dict[str, Any]] = None
     message: Optional[str] = None
 
+class AgentConfig(BaseModel):
+    id: str
+    name: str
+    prompts: str
+    voice_settings: Dict[str, Any]
+    retell_agent_id: Optional[str] = None
+    is_active: Optional[bool] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class AgentConfigListResponse(BaseModel):
+    success: bool
+    configs: List[AgentConfig]
+
 # WebSocket Models
 class RetellWebhookRequest(BaseModel):
     call_id: str
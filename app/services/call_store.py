@@ -0,0 +1,120 @@
+"""
+Call State Store
+Shared storage for in-flight call data (metadata, extracted data, transcript)
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Any
+
+import orjson
+from cachetools import TTLCache
+
+from app.core.config import settings
+
+
+@dataclass(slots=True)
+class CallState:
+    """Working state for one call, held by the WebSocket handler for the whole connection"""
+    driver_name: str = "Driver"
+    load_number: str = "your load"
+    phone_number: str = ""
+    extracted_data: Dict[str, Any] = field(default_factory=dict)
+    full_transcript: List[Dict[str, Any]] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CallState":
+        return cls(
+            driver_name=data.get("driver_name", "Driver"),
+            load_number=data.get("load_number", "your load"),
+            phone_number=data.get("phone_number", ""),
+            extracted_data=data.get("extracted_data", {}),
+            full_transcript=data.get("full_transcript", [])
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "driver_name": self.driver_name,
+            "load_number": self.load_number,
+            "phone_number": self.phone_number,
+            "extracted_data": self.extracted_data,
+            "full_transcript": self.full_transcript
+        }
+
+
+class InMemoryCallStore:
+    """Per-process call store - only safe with a single uvicorn worker
+
+    Backed by a TTLCache so abandoned calls (no webhook, dropped socket) are
+    evicted after the TTL and the store can never grow past max_calls entries.
+    """
+
+    def __init__(self, ttl: int, max_calls: int = 10_000):
+        self.ttl = ttl
+        self._calls: TTLCache = TTLCache(maxsize=max_calls, ttl=ttl)
+
+    async def get(self, call_id: str) -> Dict[str, Any]:
+        """Get call data, or an empty dict if the call is unknown or expired"""
+        return self._calls.get(call_id, {})
+
+    async def set(self, call_id: str, data: Dict[str, Any]):
+        """Replace call data and reset its TTL"""
+        self._calls[call_id] = data
+
+    async def close(self):
+        self._calls.clear()
+
+
+class RedisCallStore:
+    """Redis-backed call store shared by all workers and containers
+
+    Each call is a hash (call:<id>) whose top-level fields are JSON encoded.
+    """
+
+    def __init__(self, url: str, ttl: int):
+        import redis.asyncio as redis
+
+        self.ttl = ttl
+        self._redis = redis.from_url(url, decode_responses=True)
+
+    @staticmethod
+    def _key(call_id: str) -> str:
+        return f"call:{call_id}"
+
+    async def get(self, call_id: str) -> Dict[str, Any]:
+        """Get call data, or an empty dict if the call is unknown or expired"""
+        raw = await self._redis.hgetall(self._key(call_id))
+        return {field: orjson.loads(value) for field, value in raw.items()}
+
+    async def set(self, call_id: str, data: Dict[str, Any]):
+        """Replace call data and reset its TTL"""
+        key = self._key(call_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            if data:
+                pipe.hset(key, mapping={field: orjson.dumps(value) for field, value in data.items()})
+                pipe.expire(key, self.ttl)
+            await pipe.execute()
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+# Global instance
+_call_store = None
+
+def get_call_store():
+    """Get or create the call store (Redis when REDIS_URL is set)"""
+    global _call_store
+    if _call_store is None:
+        if settings.REDIS_URL:
+            _call_store = RedisCallStore(settings.REDIS_URL, settings.CALL_STATE_TTL)
+        else:
+            _call_store = InMemoryCallStore(settings.CALL_STATE_TTL)
+    return _call_store
+
+async def close_call_store():
+    """Close the call store's connections, if it was created"""
+    global _call_store
+    if _call_store is not None:
+        await _call_store.close()
+        _call_store = None
@@ -3,15 +3,37 @@ Database Service
 Abstracted database operations for the application
 """
 
+import asyncio
+import logging
 import psycopg2
+import psycopg2.errors
 import psycopg2.extras
-import json
-from typing import Dict, List, Optional, Any
-from datetime import datetime
+import psycopg2.pool
+import threading
+import time
+import weakref
+import orjson
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Optional, Any
 from contextlib import contextmanager
 
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
+# Decode JSON/JSONB columns with orjson instead of the stdlib json module
+psycopg2.extras.register_default_json(loads=orjson.loads, globally=True)
+psycopg2.extras.register_default_jsonb(loads=orjson.loads, globally=True)
+
+# Advanced realistic voice settings (managed by backend, never overridden)
+DEFAULT_ADVANCED_VOICE_SETTINGS = MappingProxyType({
+    "enable_backchannel": True,
+    "backchannel_frequency": 0.8,
+    "backchannel_words": ("mm-hmm", "uh-huh", "I see", "okay", "right", "got it", "sure", "alright"),
+    "end_call_after_silence_ms": 10000,
+    "max_call_duration_ms": 300000
+})
+
 def get_realistic_voice_settings(base_settings: Dict[str, Any] = None) -> Dict[str, Any]:
     """Get complete voice settings with realistic voice features"""
     if base_settings is None:
@@ -22,20 +44,146 @@ def get_realistic_voice_settings(base_settings: Dict[str, Any] = None) -> Dict[s
         "temperature": base_settings.get("temperature", 0.7),
         "speed": base_settings.get("speed", 0.8),
         "interruption_sensitivity": base_settings.get("interruption_sensitivity", 0.8),
-        
-        # Advanced realistic voice settings (managed by backend)
-        "enable_backchannel": True,
-        "backchannel_frequency": 0.8,
-        "backchannel_words": ["mm-hmm", "uh-huh", "I see", "okay", "right", "got it", "sure", "alright"],
-        "end_call_after_silence_ms": 10000,
-        "max_call_duration_ms": 300000
+        **DEFAULT_ADVANCED_VOICE_SETTINGS
     }
 
+# Active agent config only changes via save_agent_config; the TTL covers writes from other processes
+ACTIVE_CONFIG_CACHE_TTL = 60.0
+
+# Timestamps are rendered as ISO 8601 (UTC) strings by Postgres, so rows need no per-column conversion
+CALL_HISTORY_QUERY = """
+SELECT 
+    id, call_id, driver_name, phone_number, load_number, 
+    call_status, call_outcome, driver_status, current_location, 
+    eta, emergency_type, emergency_location, escalation_status,
+    full_transcript, structured_data, call_metadata,
+    to_char(call_started_at AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US"Z"') AS call_started_at,
+    to_char(call_ended_at AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US"Z"') AS call_ended_at,
+    to_char(COALESCE(created_at, NOW()) AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US"Z"') AS created_at
+FROM call_results 
+{where}
+ORDER BY call_results.created_at DESC 
+LIMIT {limit}
+"""
+
+# Containment filter - served by the GIN (jsonb_path_ops) index on structured_data
+CALL_HISTORY_FILTER = "WHERE structured_data @> %s::jsonb"
+
+def _call_history_query(limit: int, structured_filter: Optional[Dict[str, Any]] = None) -> tuple[str, tuple]:
+    """Build the call history query, optionally filtered on structured_data"""
+    if structured_filter:
+        return CALL_HISTORY_QUERY.format(where=CALL_HISTORY_FILTER, limit="%s"), (orjson.dumps(structured_filter).decode(), limit)
+    return CALL_HISTORY_QUERY.format(where="", limit="%s"), (limit,)
+
+# Server-side prepared statement state no longer matches what _prepared tracks
+PREPARED_STATEMENT_ERRORS = (
+    psycopg2.errors.InvalidSqlStatementName,      # statement doesn't exist on this session
+    psycopg2.errors.DuplicatePreparedStatement,   # session already has it (pooled backend)
+    psycopg2.errors.FeatureNotSupported           # cached plan must not change result type
+)
+
+# Columns update_call_result can set; the statement below takes them in this order
+CALL_TEXT_FIELDS = (
+    "call_status", "call_outcome", "driver_status", "current_location",
+    "eta", "emergency_type", "emergency_location", "escalation_status"
+)
+CALL_JSON_FIELDS = ("full_transcript", "structured_data")
+UPDATABLE_CALL_FIELDS = frozenset(CALL_TEXT_FIELDS + CALL_JSON_FIELDS + ("call_ended_at",))
+
+# Hot queries prepared once per pooled connection, so repeat calls skip parse/plan.
+# Columns are listed explicitly: a prepared SELECT * breaks ("cached plan must not change
+# result type") after any ALTER TABLE.
+PREPARED_QUERIES = {
+    "active_agent_config": """
+        SELECT id, name, prompts, voice_settings, retell_agent_id, is_active, created_at, updated_at
+        FROM agent_configurations 
+        WHERE is_active = true 
+        ORDER BY created_at DESC 
+        LIMIT 1
+    """,
+    "call_history": CALL_HISTORY_QUERY.format(where="", limit="$1"),
+    # Only the columns the call details response uses. The raw transcript and structured_data
+    # blobs stay on the server - the columns already carry the extracted fields.
+    # The conversation comes from the call_transcripts rows; calls stored before those
+    # were written fall back to Postgres unnesting the JSONB transcript.
+    "call_by_call_id": """
+        SELECT 
+            cr.id, cr.call_id, cr.agent_configuration_id, cr.driver_name, cr.phone_number, cr.load_number, 
+            cr.call_status, cr.call_outcome, cr.driver_status, cr.current_location, 
+            cr.eta, cr.emergency_type, cr.emergency_location, cr.escalation_status, cr.call_metadata,
+            to_char(cr.call_started_at AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US"Z"') AS call_started_at,
+            to_char(cr.call_ended_at AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US"Z"') AS call_ended_at,
+            to_char(COALESCE(cr.created_at, NOW()) AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US"Z"') AS created_at,
+            to_char(cr.updated_at AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US"Z"') AS updated_at,
+            COALESCE(turns.messages, conv.messages, '[]'::jsonb) AS full_conversation
+        FROM call_results cr
+        LEFT JOIN LATERAL (
+            SELECT jsonb_agg(jsonb_build_object(
+                'role', ct.role,
+                'content', ct.content,
+                'sequence_number', ct.sequence_number,
+                'timestamp', to_char(ct.timestamp AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US"Z"')
+            ) ORDER BY ct.sequence_number) AS messages
+            FROM call_transcripts ct
+            WHERE ct.call_result_id = cr.id
+        ) turns ON true
+        LEFT JOIN LATERAL (
+            SELECT jsonb_agg(jsonb_build_object(
+                'role', COALESCE(t.elem->>'role', 'user'),
+                'content', COALESCE(t.elem->>'content', ''),
+                'sequence_number', t.ord - 1
+            ) ORDER BY t.ord) AS messages
+            FROM jsonb_array_elements(cr.full_transcript) WITH ORDINALITY AS t(elem, ord)
+            WHERE turns.messages IS NULL
+        ) conv ON true
+        WHERE cr.call_id = $1
+    """,
+    # One statement for every partial update: NULL parameters keep the current value
+    "update_call_result": """
+        UPDATE call_results SET 
+            call_status = COALESCE($1, call_status),
+            call_outcome = COALESCE($2, call_outcome),
+            driver_status = COALESCE($3, driver_status),
+            current_location = COALESCE($4, current_location),
+            eta = COALESCE($5, eta),
+            emergency_type = COALESCE($6, emergency_type),
+            emergency_location = COALESCE($7, emergency_location),
+            escalation_status = COALESCE($8, escalation_status),
+            full_transcript = COALESCE($9::jsonb, full_transcript),
+            structured_data = COALESCE($10::jsonb, structured_data),
+            call_ended_at = CASE WHEN $11::boolean THEN NOW() ELSE call_ended_at END,
+            updated_at = NOW()
+        WHERE call_id = $12
+        RETURNING id
+    """
+}
+
+class PoolExhausted(Exception):
+    """No pooled connection became free within DB_POOL_TIMEOUT seconds
+
+    Request-facing methods let it propagate so the app can answer with a 503.
+    """
+
 class DatabaseService:
     def __init__(self):
         """Initialize database service"""
         self.connection_params = self._get_connection_params()
-        print("✅ Database service initialized")
+        # Connections are opened once and reused instead of connecting per query
+        self._pool = psycopg2.pool.ThreadedConnectionPool(
+            settings.DB_POOL_MIN_SIZE,
+            settings.DB_POOL_MAX_SIZE,
+            **self.connection_params
+        )
+        # ThreadedConnectionPool raises when exhausted - make callers wait (up to DB_POOL_TIMEOUT) for a free connection instead
+        self._pool_slots = threading.BoundedSemaphore(settings.DB_POOL_MAX_SIZE)
+        # Names of PREPARE'd statements per connection; entries go away with closed connections
+        self._prepared: "weakref.WeakKeyDictionary[Any, set]" = weakref.WeakKeyDictionary()
+        self._active_config_cache: Optional[Dict[str, Any]] = None
+        self._active_config_expires = 0.0
+        # Bumped by every save, so a lookup that raced a save can't cache the old row
+        self._active_config_generation = 0
+        self._active_config_lock = threading.Lock()
+        logger.info("✅ Database service initialized")
 
     def _get_connection_params(self) -> Dict[str, str]:
         """Get database connection parameters"""
@@ -47,23 +195,34 @@ class DatabaseService:
             "password": settings.DB_PASSWORD,
             "host": settings.DB_HOST,
             "port": settings.DB_PORT,
-            "dbname": settings.DB_NAME
+            "dbname": settings.DB_NAME,
+            # Fail fast instead of hanging on an unreachable host
+            "connect_timeout": settings.DB_CONNECT_TIMEOUT
         }
 
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections"""
-        connection = None
+        """Context manager for pooled database connections"""
+        # Bounded wait - long NDJSON streams hold a connection, and worker threads must not hang forever behind them
+        if not self._pool_slots.acquire(timeout=settings.DB_POOL_TIMEOUT):
+            raise PoolExhausted(f"No database connection free after {settings.DB_POOL_TIMEOUT:.0f}s")
         try:
-            connection = psycopg2.connect(**self.connection_params)
-            yield connection
-        except Exception as e:
-            if connection:
-                connection.rollback()
-            raise e
+            connection = self._pool.getconn()
+            try:
+                yield connection
+            except Exception as e:
+                if not connection.closed:
+                    connection.rollback()
+                raise e
+            finally:
+                # Broken connections are discarded; the pool rolls back any open transaction
+                self._pool.putconn(connection, close=bool(connection.closed))
         finally:
-            if connection:
-                connection.close()
+            self._pool_slots.release()
+
+    def close(self):
+        """Close all pooled connections"""
+        self._pool.closeall()
 
     @contextmanager
     def get_cursor(self, connection=None):
@@ -82,76 +241,102 @@ class DatabaseService:
                 finally:
                     cursor.close()
 
+    def _execute_prepared(self, cursor, name: str, params: tuple = ()):
+        """Execute one of PREPARED_QUERIES, preparing it on the cursor's connection first if needed
+
+        Must be the first statement of the transaction: if the server's prepared
+        statements no longer match what we tracked, the transaction is rolled back,
+        the session's statements are dropped and the query is prepared again.
+        """
+        try:
+            self._run_prepared(cursor, name, params)
+        except PREPARED_STATEMENT_ERRORS:
+            # Happens behind transaction-mode poolers (e.g. Supabase on port 6543), where each
+            # transaction may land on a different server session, or after a schema change
+            cursor.connection.rollback()
+            cursor.execute("DEALLOCATE ALL")
+            self._prepared[cursor.connection] = set()
+            self._run_prepared(cursor, name, params)
+
+    def _run_prepared(self, cursor, name: str, params: tuple):
+        prepared = self._prepared.setdefault(cursor.connection, set())
+        if name not in prepared:
+            cursor.execute(f"PREPARE {name} AS {PREPARED_QUERIES[name]}")
+            prepared.add(name)
+        if params:
+            cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+        else:
+            cursor.execute(f"EXECUTE {name}")
+
+    def ping(self):
+        """Run a trivial query to verify (and warm up) database connectivity"""
+        with self.get_cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+
     # Agent Configuration Methods
     def get_active_agent_config(self) -> Optional[Dict[str, Any]]:
-        """Get the currently active agent configuration"""
+        """Get the currently active agent configuration (cached for ACTIVE_CONFIG_CACHE_TTL seconds)"""
+        cached = self._active_config_cache
+        if cached is not None and time.monotonic() < self._active_config_expires:
+            return dict(cached)
+        
+        generation = self._active_config_generation
         try:
             with self.get_cursor() as cursor:
-                cursor.execute("""
-                    SELECT * FROM agent_configurations 
-                    WHERE is_active = true 
-                    ORDER BY created_at DESC 
-                    LIMIT 1
-                """)
+                self._execute_prepared(cursor, "active_agent_config")
                 result = cursor.fetchone()
                 
                 if result:
-                    config = dict(result)
-                    if config.get('voice_settings'):
-                        config['voice_settings'] = json.loads(config['voice_settings']) if isinstance(config['voice_settings'], str) else config['voice_settings']
-                    return config
+                    # RealDictRow is already a dict - cache it and hand callers a copy
+                    with self._active_config_lock:
+                        if generation == self._active_config_generation:
+                            self._active_config_expires = time.monotonic() + ACTIVE_CONFIG_CACHE_TTL
+                            self._active_config_cache = result
+                    return dict(result)
                 return None
-        except Exception as e:
-            print(f"Error getting active agent config: {e}")
+        except PoolExhausted:
+            raise
+        except Exception:
+            logger.exception("Error getting active agent config")
             return None
 
-    async def save_agent_config(self, config_data: Dict[str, Any]) -> Optional[str]:
+    def save_agent_config(self, config_data: Dict[str, Any]) -> Optional[str]:
         """Save or update agent configuration"""
         try:
             with self.get_connection() as connection:
                 with connection.cursor() as cursor:
-                    cursor.execute("SELECT id FROM agent_configurations WHERE is_active = true")
-                    existing = cursor.fetchone()
-                    
                     # Merge frontend voice settings with advanced realistic voice settings
                     frontend_voice_settings = config_data.get("voice_settings", {})
                     complete_voice_settings = get_realistic_voice_settings(frontend_voice_settings)
-                    voice_settings_json = json.dumps(complete_voice_settings)
+                    voice_settings_json = orjson.dumps(complete_voice_settings).decode()
                     
-                    if existing:
-                        cursor.execute("""
-                            UPDATE agent_configurations 
-                            SET name = %s, prompts = %s, voice_settings = %s, updated_at = NOW()
-                            WHERE id = %s
-                            RETURNING id
-                        """, (
-                            config_data.get("name", "Updated Agent"),
-                            config_data.get("prompts", ""),
-                            voice_settings_json,
-                            existing[0]
-                        ))
-                        result = cursor.fetchone()
-                        if result:
-                            connection.commit()
-                            return result[0]
-                    else:
-                        cursor.execute("""
-                            INSERT INTO agent_configurations (name, prompts, voice_settings, is_active)
-                            VALUES (%s, %s, %s, true)
-                            RETURNING id
-                        """, (
-                            config_data.get("name", "New Agent"),
-                            config_data.get("prompts", ""),
-                            voice_settings_json
-                        ))
-                        result = cursor.fetchone()
-                        if result:
-                            connection.commit()
-                            return result[0]
+                    # Single upsert against the one-active-config partial unique index
+                    cursor.execute("""
+                        INSERT INTO agent_configurations (name, prompts, voice_settings, is_active)
+                        VALUES (%s, %s, %s, true)
+                        ON CONFLICT (is_active) WHERE is_active
+                        DO UPDATE SET name = EXCLUDED.name, prompts = EXCLUDED.prompts,
+                                      voice_settings = EXCLUDED.voice_settings, updated_at = NOW()
+                        RETURNING id
+                    """, (
+                        config_data.get("name", "New Agent"),
+                        config_data.get("prompts", ""),
+                        voice_settings_json
+                    ))
+                    result = cursor.fetchone()
+                    if result:
+                        connection.commit()
+                        with self._active_config_lock:
+                            self._active_config_generation += 1
+                            self._active_config_cache = None
+                        return result[0]
                     
                     return None
-        except Exception as e:
-            print(f"Error saving agent config: {e}")
+        except PoolExhausted:
+            raise
+        except Exception:
+            logger.exception("Error saving agent config")
             return None
 
     def get_all_agent_configs(self) -> List[Dict[str, Any]]:
@@ -162,44 +347,40 @@ class DatabaseService:
                     SELECT * FROM agent_configurations 
                     ORDER BY created_at DESC
                 """)
-                results = cursor.fetchall()
-                
-                configs = []
-                for result in results:
-                    config = dict(result)
-                    if config.get('voice_settings'):
-                        config['voice_settings'] = json.loads(config['voice_settings']) if isinstance(config['voice_settings'], str) else config['voice_settings']
-                    configs.append(config)
-                
-                return configs
-        except Exception as e:
-            print(f"Error getting agent configs: {e}")
+                # RealDictRow subclasses dict, so rows are returned as-is
+                return cursor.fetchall()
+        except PoolExhausted:
+            raise
+        except Exception:
+            logger.exception("Error getting agent configs")
             return []
 
     # Call Results Methods
+    # psycopg2 is blocking, so the async variants run the query in a worker thread
     async def create_call_result(self, call_data: Dict[str, Any]) -> Optional[str]:
         """Create a new call result record"""
+        return await asyncio.to_thread(self._create_call_result, call_data)
+
+    def _create_call_result(self, call_data: Dict[str, Any]) -> Optional[str]:
         try:
             with self.get_connection() as connection:
                 with connection.cursor() as cursor:
-                    cursor.execute("SELECT id FROM agent_configurations WHERE is_active = true LIMIT 1")
-                    active_config = cursor.fetchone()
-                    agent_config_id = active_config[0] if active_config else None
-                    
+                    # Active config is looked up in the same statement - one round trip per call start
                     cursor.execute("""
                         INSERT INTO call_results (
                             call_id, agent_configuration_id, driver_name, phone_number, 
                             load_number, call_status, call_started_at, call_metadata
-                        ) VALUES (%s, %s, %s, %s, %s, %s, NOW(), %s)
+                        )
+                        SELECT %s, (SELECT id FROM agent_configurations WHERE is_active = true LIMIT 1),
+                               %s, %s, %s, %s, NOW(), %s::jsonb
                         RETURNING id
                     """, (
                         call_data.get("call_id"),
-                        agent_config_id,
                         call_data.get("driver_name"),
                         call_data.get("phone_number"),
                         call_data.get("load_number"),
                         "in_progress",
-                        json.dumps(call_data.get("metadata", {}))
+                        orjson.dumps(call_data.get("metadata", {})).decode()
                     ))
                     
                     result = cursor.fetchone()
@@ -207,119 +388,110 @@ class DatabaseService:
                         connection.commit()
                         return result[0]
                     return None
-        except Exception as e:
-            print(f"Error creating call result: {e}")
+        except Exception:
+            logger.exception("Error creating call result")
             return None
 
     async def update_call_result(self, call_id: str, update_data: Dict[str, Any]) -> bool:
         """Update call result with structured data and transcript"""
+        return await asyncio.to_thread(self._update_call_result, call_id, update_data)
+
+    def _update_call_result(self, call_id: str, update_data: Dict[str, Any]) -> bool:
         try:
             with self.get_connection() as connection:
                 with connection.cursor() as cursor:
-                    set_clauses = []
-                    values = []
-                    
-                    for field, value in update_data.items():
-                        if field in ['call_status', 'call_outcome', 'driver_status', 'current_location', 
-                                   'eta', 'emergency_type', 'emergency_location', 'escalation_status']:
-                            set_clauses.append(f"{field} = %s")
-                            values.append(value)
-                        elif field in ['full_transcript', 'structured_data']:
-                            set_clauses.append(f"{field} = %s")
-                            values.append(json.dumps(value) if value else None)
-                        elif field == 'call_ended_at':
-                            set_clauses.append(f"{field} = NOW()")
-                    
-                    if not set_clauses:
+                    if not UPDATABLE_CALL_FIELDS & update_data.keys():
                         return False
                     
-                    set_clauses.append("updated_at = NOW()")
-                    values.append(call_id)
-                    
-                    query = f"""
-                        UPDATE call_results 
-                        SET {', '.join(set_clauses)}
-                        WHERE call_id = %s
-                    """
+                    # Fixed parameter list - fields missing from update_data are passed as NULL and left unchanged
+                    params = [update_data.get(field) for field in CALL_TEXT_FIELDS]
+                    params.extend(
+                        orjson.dumps(update_data[field]).decode() if update_data.get(field) else None
+                        for field in CALL_JSON_FIELDS
+                    )
+                    params.append('call_ended_at' in update_data)
+                    params.append(call_id)
                     
-                    cursor.execute(query, values)
+                    self._execute_prepared(cursor, "update_call_result", tuple(params))
+                    updated = cursor.fetchone()
                     connection.commit()
                     
-                    return cursor.rowcount > 0
-        except Exception as e:
-            print(f"Error updating call result: {e}")
+                    if updated and update_data.get('full_transcript'):
+                        self._replace_conversation_turns(connection, updated[0], update_data['full_transcript'])
+                    
+                    return updated is not None
+        except Exception:
+            logger.exception("Error updating call result")
             return False
 
-    def get_call_history(self, limit: int = 50) -> List[Dict[str, Any]]:
-        """Get call history with pagination"""
+    @staticmethod
+    def _replace_conversation_turns(connection, call_result_id: str, transcript: List[Dict[str, Any]]):
+        """Store a call's transcript as one call_transcripts row per message"""
+        # Separate transaction - a bad transcript must not roll back the call result update
+        try:
+            with connection.cursor() as cursor:
+                # The transcript is always the full conversation so far - replace rather than append
+                cursor.execute("DELETE FROM call_transcripts WHERE call_result_id = %s", (call_result_id,))
+                rows = [
+                    (call_result_id, i, entry.get('role') or 'user', entry.get('content') or '')
+                    for i, entry in enumerate(transcript)
+                ]
+                # One multi-row INSERT per 500 messages instead of a round trip per message
+                psycopg2.extras.execute_values(
+                    cursor,
+                    "INSERT INTO call_transcripts (call_result_id, sequence_number, role, content) VALUES %s",
+                    rows,
+                    page_size=500
+                )
+            connection.commit()
+        except Exception:
+            if not connection.closed:
+                connection.rollback()
+            logger.exception("Error storing conversation turns for call result %s", call_result_id)
+
+    def get_call_history(self, limit: int = 50, structured_filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Get call history with pagination, optionally only calls whose structured data contains structured_filter"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
                 
-                query = """
-                SELECT 
-                    id, call_id, driver_name, phone_number, load_number, 
-                    call_status, call_outcome, driver_status, current_location, 
-                    eta, emergency_type, emergency_location, escalation_status,
-                    full_transcript, structured_data, call_metadata,
-                    call_started_at, call_ended_at, created_at
-                FROM call_results 
-                ORDER BY created_at DESC 
-                LIMIT %s
-                """
-                
-                cursor.execute(query, (limit,))
-                results = cursor.fetchall()
+                # Bounded result for a single JSON response - one prepared round trip
+                if structured_filter:
+                    cursor.execute(*_call_history_query(limit, structured_filter))
+                else:
+                    self._execute_prepared(cursor, "call_history", (limit,))
                 
-                call_history = []
-                for row in results:
-                    call_data = dict(row)
-                    
-                    # Convert datetime objects to strings and handle JSON fields
-                    for key, value in call_data.items():
-                        if isinstance(value, datetime):
-                            call_data[key] = value.isoformat()
-                        elif key in ['full_transcript', 'structured_data', 'call_metadata'] and value:
-                            if isinstance(value, str):
-                                try:
-                                    call_data[key] = json.loads(value)
-                                except json.JSONDecodeError:
-                                    call_data[key] = value
-                    
-                    # Ensure we have proper default values
-                    if not call_data.get('created_at'):
-                        call_data['created_at'] = datetime.now().isoformat()
-                    
-                    call_history.append(call_data)
-                
-                return call_history
-                
-        except Exception as e:
-            print(f"❌ Error getting call history: {e}")
+                # Timestamps are formatted and JSONB decoded by the query - rows are ready as-is
+                return cursor.fetchall()
+        except PoolExhausted:
+            raise
+        except Exception:
+            logger.exception("❌ Error getting call history")
             return []
 
-    def get_call_with_tools(self, call_id: str) -> Optional[Dict[str, Any]]:
-        """Get call details with tool calls and conversation history"""
+    def iter_call_history(self, limit: int = 50, structured_filter: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Stream call history rows through a server-side cursor (for the NDJSON response)"""
+        with self.get_connection() as conn:
+            # Named cursor: rows are fetched from Postgres in batches instead of all at once
+            with conn.cursor(name="call_history", cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                cursor.itersize = 200
+                cursor.execute(*_call_history_query(limit, structured_filter))
+                # Timestamps are formatted and JSONB decoded by the query, and RealDictRow
+                # is already a dict - rows are ready as-is
+                yield from cursor
+
+    def get_call_with_conversation(self, call_id: str) -> Optional[Dict[str, Any]]:
+        """Get call details and its conversation history in a single query"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
                 
-                query = """
-                SELECT * FROM call_results 
-                WHERE call_id = %s
-                """
-                
-                cursor.execute(query, (call_id,))
+                self._execute_prepared(cursor, "call_by_call_id", (call_id,))
                 result = cursor.fetchone()
                 
                 if result:
-                    call_data = dict(result)
-                    
-                    # Convert datetime objects to strings
-                    for key, value in call_data.items():
-                        if isinstance(value, datetime):
-                            call_data[key] = value.isoformat()
-                    
+                    # Timestamps are formatted and the conversation built by the query
+                    call_data = result
                     call_data['tool_calls'] = []
                     call_data['conversation_messages'] = []
                     
@@ -327,55 +499,29 @@ class DatabaseService:
                 
                 return None
                 
-        except Exception as e:
-            print(f"❌ Error getting call with tools: {e}")
+        except PoolExhausted:
+            raise
+        except Exception:
+            logger.exception("❌ Error getting call with conversation")
             return None
 
-    def get_call_conversation(self, call_id: str) -> List[Dict[str, Any]]:
-        """Get full conversation history for a call"""
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-                
-                query = """
-                SELECT full_transcript FROM call_results 
-                WHERE call_id = %s
-                """
-                
-                cursor.execute(query, (call_id,))
-                result = cursor.fetchone()
-                
-                if result and result['full_transcript']:
-                    transcript = result['full_transcript']
-                    if isinstance(transcript, str):
-                        transcript = json.loads(transcript)
-                    
-                    conversation = []
-                    for i, entry in enumerate(transcript):
-                        conversation.append({
-                            'role': entry.get('role', 'user'),
-                            'content': entry.get('content', ''),
-                            'sequence_number': i,
-                            'timestamp': None,
-                            'tool_name': None,
-                            'tool_arguments': None,
-                            'tool_result': None
-                        })
-                    
-                    return conversation
-                
-                return []
-                
-        except Exception as e:
-            print(f"❌ Error getting conversation: {e}")
-            return []
-
 # Global instance
 _database_service = None
+_database_service_lock = threading.Lock()
 
 def get_database_service() -> DatabaseService:
     """Get or create database service instance"""
     global _database_service
     if _database_service is None:
-        _database_service = DatabaseService()
+        # Sync endpoints run in the threadpool - make sure only one pool gets created
+        with _database_service_lock:
+            if _database_service is None:
+                _database_service = DatabaseService()
     return _database_service
+
+def close_database_service():
+    """Close the database service's connection pool, if it was created"""
+    global _database_service
+    if _database_service is not None:
+        _database_service.close()
+        _database_service = None
@@ -67,12 +67,47 @@ CREATE TABLE IF NOT EXISTS call_transcripts (
     metadata JSONB
 );
 
+-- Upgrade databases created with plain JSON columns to JSONB
+-- (JSONB is stored pre-parsed, decoded to dicts by psycopg2 and indexable)
+DO $$
+DECLARE
+    col RECORD;
+BEGIN
+    FOR col IN
+        SELECT table_name, column_name
+        FROM information_schema.columns
+        WHERE table_schema = current_schema()
+          AND data_type = 'json'
+          AND (table_name, column_name) IN (
+              ('agent_configurations', 'voice_settings'),
+              ('call_results', 'full_transcript'),
+              ('call_results', 'structured_data'),
+              ('call_results', 'call_metadata')
+          )
+    LOOP
+        EXECUTE format('ALTER TABLE %I ALTER COLUMN %I TYPE JSONB USING %I::jsonb',
+                       col.table_name, col.column_name, col.column_name);
+    END LOOP;
+END $$;
+
 -- Indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_agent_configurations_active ON agent_configurations(is_active);
 CREATE INDEX IF NOT EXISTS idx_call_results_call_id ON call_results(call_id);
 CREATE INDEX IF NOT EXISTS idx_call_results_created_at ON call_results(created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_call_results_driver_name ON call_results(driver_name);
 CREATE INDEX IF NOT EXISTS idx_call_results_load_number ON call_results(load_number);
+-- GIN indexes for JSONB containment filters (structured_data @> '{"emergency_type": "Accident"}').
+-- jsonb_path_ops only supports @> but is much smaller and faster than the default jsonb_ops.
+-- On a large live table, create these with CREATE INDEX CONCURRENTLY outside a transaction instead.
+CREATE INDEX IF NOT EXISTS idx_call_results_structured_gin ON call_results USING GIN (structured_data jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS idx_call_results_metadata_gin ON call_results USING GIN (call_metadata jsonb_path_ops);
+-- At most one active agent configuration; save_agent_config upserts against this index,
+-- and it also serves the active config lookup as a single-row probe.
+-- Older databases may have several active rows - keep only the newest one active.
+UPDATE agent_configurations SET is_active = false
+WHERE is_active = true
+  AND id <> (SELECT id FROM agent_configurations WHERE is_active = true ORDER BY created_at DESC LIMIT 1);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_agent_configurations_one_active ON agent_configurations(is_active) WHERE is_active;
 CREATE INDEX IF NOT EXISTS idx_call_transcripts_call_result_id ON call_transcripts(call_result_id);
 CREATE INDEX IF NOT EXISTS idx_call_transcripts_sequence ON call_transcripts(call_result_id, sequence_number);
 
@@ -4,6 +4,8 @@ Application Runner
 Start the FastAPI application
 """
 
+import sys
+
 import uvicorn
 
 if __name__ == "__main__":
@@ -12,5 +14,7 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=True,
-        log_level="info"
+        log_level="info",
+        # uvloop (installed with uvicorn[standard]) is not available on Windows
+        loop="asyncio" if sys.platform == "win32" else "uvloop"
     )
@@ -0,0 +1,101 @@
+"""
+Database service tests
+Prepared statement recovery in _execute_prepared
+"""
+
+import weakref
+
+import psycopg2.errors
+import pytest
+
+from app.services.database import DatabaseService
+
+
+class FakeConnection:
+    def __init__(self):
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class FakeCursor:
+    """Records statements; raises the queued errors for the first matching statements"""
+
+    def __init__(self, connection, failures=None):
+        self.connection = connection
+        self.statements = []
+        self._failures = list(failures or [])
+
+    def execute(self, query, params=None):
+        # Keep the verb and statement name, e.g. "EXECUTE call_history"
+        self.statements.append(" ".join(query.split()[:2]))
+        if self._failures and query.startswith(self._failures[0][0]):
+            _, error = self._failures.pop(0)
+            raise error
+
+
+@pytest.fixture
+def db():
+    # Skip __init__ - it opens a connection pool
+    service = DatabaseService.__new__(DatabaseService)
+    service._prepared = weakref.WeakKeyDictionary()
+    return service
+
+
+def test_prepares_once_per_connection(db):
+    cursor = FakeCursor(FakeConnection())
+    db._execute_prepared(cursor, "call_by_call_id", ("call-1",))
+    db._execute_prepared(cursor, "call_by_call_id", ("call-2",))
+    assert cursor.statements == [
+        "PREPARE call_by_call_id",
+        "EXECUTE call_by_call_id",
+        "EXECUTE call_by_call_id",
+    ]
+
+
+def test_missing_statement_is_prepared_again(db):
+    # Tracked as prepared, but the server session doesn't have it (transaction-mode pooler)
+    connection = FakeConnection()
+    db._prepared[connection] = {"call_by_call_id"}
+    cursor = FakeCursor(connection, [("EXECUTE", psycopg2.errors.InvalidSqlStatementName())])
+
+    db._execute_prepared(cursor, "call_by_call_id", ("call-1",))
+
+    assert connection.rollbacks == 1
+    assert cursor.statements == [
+        "EXECUTE call_by_call_id",
+        "DEALLOCATE ALL",
+        "PREPARE call_by_call_id",
+        "EXECUTE call_by_call_id",
+    ]
+    assert db._prepared[connection] == {"call_by_call_id"}
+
+
+def test_duplicate_statement_is_deallocated(db):
+    # Not tracked, but the server session already has it
+    connection = FakeConnection()
+    cursor = FakeCursor(connection, [("PREPARE", psycopg2.errors.DuplicatePreparedStatement())])
+
+    db._execute_prepared(cursor, "active_agent_config")
+
+    assert connection.rollbacks == 1
+    assert cursor.statements == [
+        "PREPARE active_agent_config",
+        "DEALLOCATE ALL",
+        "PREPARE active_agent_config",
+        "EXECUTE active_agent_config",
+    ]
+
+
+def test_second_failure_propagates(db):
+    connection = FakeConnection()
+    db._prepared[connection] = {"call_history"}
+    cursor = FakeCursor(connection, [
+        ("EXECUTE", psycopg2.errors.FeatureNotSupported()),
+        ("EXECUTE", psycopg2.errors.FeatureNotSupported()),
+    ])
+
+    with pytest.raises(psycopg2.errors.FeatureNotSupported):
+        db._execute_prepared(cursor, "call_history", (50,))
+    assert connection.rollbacks == 1
@@ -0,0 +1,93 @@
+"""
+WebSocket helper tests
+Streaming response_text decoding and tool selection
+"""
+
+import json
+
+import pytest
+
+from app.api.v1.endpoints.websocket import (
+    EMERGENCY_REQUIRED_FIELDS,
+    FORCE_END_CALL,
+    LET_MODEL_CHOOSE,
+    ResponseTextExtractor,
+    decide_tool,
+    is_bare_acknowledgment,
+)
+
+# Tool-call arguments exercising every kind of escape, including a surrogate pair
+ARGUMENTS = json.dumps({
+    "response_text": 'Say "ok" \\ then\nwait\t- café 🚚 / done',
+    "driver_status": "Driving",
+    "eta": "8pm"
+}, ensure_ascii=True)
+EXPECTED_TEXT = json.loads(ARGUMENTS)["response_text"]
+
+
+def feed_all(extractor: ResponseTextExtractor, fragments) -> str:
+    return "".join(extractor.feed(fragment) for fragment in fragments)
+
+
+def test_extractor_single_fragment():
+    extractor = ResponseTextExtractor()
+    assert feed_all(extractor, [ARGUMENTS]) == EXPECTED_TEXT
+    assert extractor.done
+
+
+@pytest.mark.parametrize("split", range(1, len(ARGUMENTS)))
+def test_extractor_two_fragments_split_anywhere(split):
+    # Covers boundaries inside the key, inside \" and \\, and inside \uXXXX / surrogate pairs
+    extractor = ResponseTextExtractor()
+    assert feed_all(extractor, [ARGUMENTS[:split], ARGUMENTS[split:]]) == EXPECTED_TEXT
+    assert extractor.done
+
+
+def test_extractor_one_character_at_a_time():
+    extractor = ResponseTextExtractor()
+    assert feed_all(extractor, ARGUMENTS) == EXPECTED_TEXT
+
+
+def test_extractor_ignores_fields_after_response_text():
+    extractor = ResponseTextExtractor()
+    extractor.feed('{"response_text": "Thanks!", ')
+    assert extractor.feed('"reason": "All data collected"}') == ""
+
+
+def test_extractor_without_response_text_key():
+    extractor = ResponseTextExtractor()
+    fragments = ['{"call_complete": true, ', '"reason": "All data ', 'collected", "confidence": 0.9}']
+    assert feed_all(extractor, fragments) == ""
+    assert not extractor.done
+
+
+def test_decide_tool_without_data_lets_model_choose():
+    assert decide_tool(None) is LET_MODEL_CHOOSE
+    assert decide_tool({}) is LET_MODEL_CHOOSE
+
+
+def test_decide_tool_partial_emergency_lets_model_choose():
+    data = {"emergency_type": "Accident", "emergency_location": "I-10 mile 42"}
+    assert decide_tool(data) is LET_MODEL_CHOOSE
+
+
+def test_decide_tool_routine_data_lets_model_choose():
+    data = {"current_location": "Phoenix", "driver_status": "Driving", "eta": "8pm"}
+    assert decide_tool(data) is LET_MODEL_CHOOSE
+
+
+def test_decide_tool_escalated_emergency_forces_end_call():
+    data = {field: "set" for field in EMERGENCY_REQUIRED_FIELDS}
+    tools, tool_choice = decide_tool(data)
+    assert (tools, tool_choice) == FORCE_END_CALL
+    assert tool_choice["function"]["name"] == "end_call"
+
+
+@pytest.mark.parametrize("text", ["okay", "Okay, thanks!", "thanks. you too", "yep, bye"])
+def test_bare_acknowledgment(text):
+    assert is_bare_acknowledgment(text)
+
+
+@pytest.mark.parametrize("text", ["actually the ETA slipped to 8pm", "ok 8pm", "yes I crashed"])
+def test_not_bare_acknowledgment(text):
+    assert not is_bare_acknowledgment(text)